@@ -0,0 +1,102 @@
+"""
+Relatório de memória da tabela de tarefas do snapshot (compact_snapshot).
+
+Gera tarefas sintéticas no formato que load_and_prepare_data montava antes (campos relacionais
+crus do Odoo, uma lista Python por linha para dependências/implicações e seus nomes) e compara
+com o esquema compacto (IDs Int64, textos categóricos, arestas CSR). Também confere se as
+dependências e os nomes montados na hora de exibir são os mesmos das colunas antigas.
+
+Uso: python benchmarks/bench_snapshot_memory.py [quantidade de tarefas ...]
+"""
+import os
+import sys
+import time
+import random
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import compact_snapshot
+
+STAGES = ['Backlog', 'Em execução', 'Revisão', 'Concluído', 'Cancelado']
+DEPARTMENTS = ['Elétrica', 'Civil', 'Mecânica', 'Automação', 'Sem Departamento']
+STATUSES = ['Concluída', 'Em Andamento', 'Atrasada', 'Planejada', 'Em Risco']
+STATES = ['01_in_progress', '1_done', '1_canceled', '04_waiting_normal']
+
+
+def make_legacy_tasks(n_tasks, tasks_per_project=250, seed=1):
+    """Tarefas no formato antigo do snapshot, com ~60% das tarefas dependendo de 1 a 3 anteriores."""
+    rng = random.Random(seed)
+    base = pd.Timestamp('2025-01-01')
+    ids = list(range(1, n_tasks + 1))
+    names = [f"Tarefa {i} - etapa de projeto" for i in ids]
+    project_ids = [1 + pos // tasks_per_project for pos in range(n_tasks)]
+    projects = {pid: f"Projeto {pid} - Cliente {pid % 37}" for pid in set(project_ids)}
+    stage_ids = [rng.randrange(len(STAGES)) for _ in ids]
+    parents, deps = [], []
+    for pos in range(n_tasks):
+        first = pos - pos % tasks_per_project # Dependências/tarefa-pai dentro do mesmo projeto
+        parents.append(ids[rng.randrange(first, pos)] if pos > first and rng.random() < 0.5 else False)
+        deps.append(sorted(rng.sample(ids[first:pos], min(pos - first, rng.randint(1, 3)))) if pos > first and rng.random() < 0.6 else [])
+    implications = {i: [] for i in ids}
+    for task_id, dep_list in zip(ids, deps):
+        for dep_id in dep_list:
+            implications[dep_id].append(task_id)
+    starts = [base + pd.Timedelta(days=rng.randint(0, 365)) for _ in ids]
+    df = pd.DataFrame({
+        'id': ids, 'name': names,
+        'create_date': starts,
+        'date_deadline': [s + pd.Timedelta(days=rng.randint(1, 60)) for s in starts],
+        'date_end': pd.NaT,
+        'project_id': [[pid, projects[pid]] for pid in project_ids],
+        'stage_id': [[sid + 1, STAGES[sid]] for sid in stage_ids],
+        'state': [rng.choice(STATES) for _ in ids],
+        'active': True,
+        'parent_id': [[p, names[p - 1]] if p else False for p in parents],
+        'depend_on_ids': deps,
+        'project_id_id': project_ids,
+        'project_id_name': [projects[pid] for pid in project_ids],
+        'stage_id_id': [sid + 1 for sid in stage_ids],
+        'stage_id_name': [STAGES[sid] for sid in stage_ids],
+        'depend_on_ids_list': [list(d) for d in deps],
+        'parent_id_id': [p if p else None for p in parents],
+        'is_open': True, 'is_final_state': False, 'is_actually_delayed': False,
+        'status_cat': [rng.choice(STATUSES) for _ in ids],
+        'calculated_start': starts,
+        'department': [DEPARTMENTS[pid % len(DEPARTMENTS)] for pid in project_ids],
+        'name_project': [projects[pid] for pid in project_ids],
+    })
+    df['depend_on_names'] = [[names[d - 1] for d in dep_list] for dep_list in deps]
+    df['implications_ids'] = [implications[i] for i in ids]
+    df['implications_names'] = [[names[t - 1] for t in implications[i]] for i in ids]
+    return df
+
+
+def run(n_tasks, show_columns=False):
+    df = make_legacy_tasks(n_tasks)
+    started = time.perf_counter()
+    df_compact, dependencies, implications = compact_snapshot.compact_tasks(df)
+    elapsed = time.perf_counter() - started
+    report = compact_snapshot.memory_report(df, df_compact, dependencies, implications)
+
+    # Conferência: o que é montado na hora de exibir bate com as colunas antigas
+    positions = np.arange(len(df_compact))
+    task_ids, task_names = pd.Index(df_compact['id']), df_compact['name'].to_numpy(dtype=object)
+    same = (dependencies.lists_for(positions) == df['depend_on_ids_list'].tolist()
+            and compact_snapshot.resolve_names(dependencies, positions, task_ids, task_names) == df['depend_on_names'].tolist()
+            and compact_snapshot.resolve_names(implications, positions, task_ids, task_names) == df['implications_names'].tolist())
+    print(f"{n_tasks:>8} tarefas | antes: {report['before_mb_per_10k']:6.2f} MB/10 mil | "
+          f"depois: {report['after_mb_per_10k']:5.2f} MB/10 mil | "
+          f"redução: {report['before_bytes'] / report['after_bytes']:4.1f}x | "
+          f"compactação: {elapsed * 1000:7.1f} ms | nomes iguais: {'sim' if same else 'NÃO'}")
+    if show_columns:
+        print("  Maiores colunas antes (bytes):")
+        print(report['columns_before'].head(8).to_string())
+        print("  Maiores colunas depois (bytes) + arestas CSR:", dependencies.nbytes + implications.nbytes)
+        print(report['columns_after'].head(8).to_string())
+
+
+if __name__ == '__main__':
+    sizes = [int(arg) for arg in sys.argv[1:]] or [1000, 10000, 100000]
+    for size in sizes:
+        run(size, show_columns=(size == 10000))
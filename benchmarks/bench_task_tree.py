@@ -0,0 +1,85 @@
+"""
+Benchmark da hierarquia de tarefas (task_tree) usada nos Gantts e na tabela.
+
+Gera projetos sintéticos com milhares de subtarefas e mede a montagem da árvore
+(profundidade + ordem pai -> subtarefas). Para tamanhos pequenos também roda a
+implementação antiga (compute_depths recursivo + list.index) e confere se o
+resultado é o mesmo.
+
+Uso: python benchmarks/bench_task_tree.py [quantidade de tarefas ...]
+"""
+import os
+import sys
+import time
+import random
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import task_tree
+
+LEGACY_MAX_TASKS = 5000 # Acima disso a versão antiga (O(n²)) demora demais
+
+
+def make_project_tasks(n_tasks, seed=1):
+    """Tarefas de um único projeto: ~70% são subtarefas de uma tarefa anterior (árvores profundas e largas)."""
+    rng = random.Random(seed)
+    base = pd.Timestamp('2025-01-01')
+    ids = list(range(1, n_tasks + 1))
+    parents, starts = [], []
+    for pos in range(n_tasks):
+        parents.append(ids[rng.randrange(pos)] if pos and rng.random() < 0.7 else None)
+        starts.append(base + pd.Timedelta(days=rng.randint(0, 365)) if rng.random() < 0.9 else pd.NaT)
+    return pd.DataFrame({'id': ids, 'parent_id_id': pd.array(parents, dtype='Int64'),
+                         'project_id_id': 1, 'start': pd.to_datetime(pd.Series(starts))})
+
+
+def legacy_depth_and_order(df_tasks, pid):
+    """Cópia da lógica antiga de generate_full_gantt/compute_depths, só para comparação."""
+    df_idx = df_tasks.set_index('id')
+    depth_dict = {}
+    def get_depth(task_id):
+        if task_id in depth_dict: return depth_dict[task_id]
+        parent_id = df_idx.loc[task_id, 'parent_id_id']
+        if pd.isna(parent_id) or parent_id not in df_idx.index:
+            depth_dict[task_id] = 0
+            return 0
+        depth_dict[task_id] = 1 + get_depth(parent_id)
+        return depth_dict[task_id]
+    for tid in df_idx.index: get_depth(tid)
+    tree = {tid: [] for tid in df_tasks['id']}
+    for task_id, row in df_idx.iterrows():
+        if pd.notna(row['parent_id_id']) and row['parent_id_id'] in tree: tree[row['parent_id_id']].append(task_id)
+    key = lambda i: df_idx.at[i, 'start'] if pd.notna(df_idx.at[i, 'start']) else pd.Timestamp.min
+    order = []
+    def trav(tid):
+        order.append(tid)
+        for ch in sorted(tree[tid], key=key): trav(ch)
+    all_children = {c for cs in tree.values() for c in cs}
+    for root in sorted([i for i in tree if i not in all_children and df_idx.at[i, 'project_id_id'] == pid], key=key): trav(root)
+    ranks = df_tasks['id'].apply(lambda i: order.index(i) if i in order else float('inf'))
+    return [depth_dict[i] for i in df_tasks['id']], ranks
+
+
+def run(n_tasks):
+    df = make_project_tasks(n_tasks)
+    started = time.perf_counter()
+    tree = task_tree.tree_for_frame(df, sort_column='start', root_mask=(df['project_id_id'] == 1).to_numpy())
+    elapsed = time.perf_counter() - started
+    line = f"{n_tasks:>8} tarefas | task_tree: {elapsed * 1000:8.1f} ms | profundidade máx.: {int(tree.depth.max()):>3}"
+    if n_tasks <= LEGACY_MAX_TASKS:
+        sys.setrecursionlimit(max(sys.getrecursionlimit(), 4 * n_tasks))
+        started = time.perf_counter()
+        legacy_depths, legacy_ranks = legacy_depth_and_order(df, 1)
+        legacy_elapsed = time.perf_counter() - started
+        new_ranks = np.full(n_tasks, np.inf)
+        new_ranks[tree.order] = np.arange(len(tree.order))
+        same = list(tree.depth) == legacy_depths and np.array_equal(new_ranks, legacy_ranks.to_numpy(dtype=float))
+        line += f" | antiga: {legacy_elapsed * 1000:9.1f} ms | resultado igual: {'sim' if same else 'NÃO'}"
+    print(line)
+
+
+if __name__ == '__main__':
+    sizes = [int(arg) for arg in sys.argv[1:]] or [500, 2000, 5000, 20000, 100000]
+    for size in sizes:
+        run(size)
@@ -0,0 +1,151 @@
+"""
+Conferência das regras de status vetorizadas (task_status) contra as versões linha a linha.
+
+Gera tabelas de tarefas sintéticas com estágios vazios (None/NaN/False/''), nomes com
+maiúsculas e acentos variados, todos os valores de 'state' conhecidos (e alguns
+desconhecidos), prazos ausentes, vencidos, de hoje e futuros e date_end preenchido ou não.
+Confere se classify_tasks dá exatamente as mesmas colunas que o antigo apply() com
+classify_task_status_revised.
+
+Também confere project_overall_status contra get_project_overall_status (com o prazo final
+calculado como no Gantt de departamento), com projetos sem tarefas, só com tarefas concluídas,
+com tarefas atrasadas, com tarefas sem status e com datas de início/fim ausentes, passadas e futuras.
+
+Uso: python benchmarks/check_task_status.py [quantidade de tabelas] [tarefas por tabela]
+Sai com código 1 se alguma tabela divergir.
+"""
+import os
+import sys
+import random
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import task_status
+
+HOJE = pd.Timestamp('2026-01-15')
+STAGE_NAMES = [None, np.nan, False, '', 'Backlog', 'A Fazer', 'Em Andamento', 'EM EXECUÇÃO', 'Revisão',
+               'Concluído', 'Concluída', 'DONE', 'Cancelado', 'Arquivada', 'Aguardando cliente', 'Aprovado',
+               'Em espera', 'Desenvolvimento', 'Entregue', 'Fechada', 'Teste', 'Validação']
+STATES = task_status.OPEN_TASK_STATES + task_status.FINAL_TASK_STATES + \
+    ['04_waiting_normal', '1_canceled', 'draft', None]
+
+
+def make_tasks(n_tasks, seed):
+    """Tarefas no formato de load_and_prepare_data antes da classificação."""
+    rng = random.Random(seed)
+    def some_date():
+        choice = rng.random()
+        if choice < 0.2: return pd.NaT
+        if choice < 0.3: return HOJE
+        return HOJE + pd.Timedelta(days=rng.randint(-200, 200), hours=rng.randint(0, 23))
+    return pd.DataFrame({
+        'id': range(1, n_tasks + 1),
+        'stage_id_name': pd.Series([rng.choice(STAGE_NAMES) for _ in range(n_tasks)], dtype=object),
+        'state': pd.Series([rng.choice(STATES) for _ in range(n_tasks)], dtype=object),
+        'date_deadline': pd.to_datetime(pd.Series([some_date() for _ in range(n_tasks)])),
+        'date_end': pd.to_datetime(pd.Series([some_date() for _ in range(n_tasks)])),
+    })
+
+
+def classify_rowwise(df_tasks, hoje):
+    """Mesmo cálculo feito antes por load_and_prepare_data, com apply() linha a linha."""
+    df = df_tasks.copy()
+    final_keywords = task_status.CONCLUIDA_KEYWORDS + task_status.CANCELADA_KEYWORDS
+    df['is_open'] = df['state'].isin(task_status.OPEN_TASK_STATES)
+    df['is_final_state'] = df.apply(lambda r:
+        r.get('state') in task_status.FINAL_TASK_STATES or
+        any(keyword in str(r.get('stage_id_name', '')).lower() for keyword in final_keywords), axis=1)
+    df['is_actually_delayed'] = df.apply(lambda r:
+        not r['is_final_state'] and pd.notna(r.get('date_deadline')) and r['date_deadline'] < hoje, axis=1)
+    df['status_cat'] = df.apply(lambda row: task_status.classify_task_status_revised(row, hoje), axis=1)
+    return df[['is_open', 'is_final_state', 'is_actually_delayed', 'status_cat']]
+
+
+def check_classification(n_frames, n_tasks):
+    """Retorna a quantidade de tabelas em que as duas versões divergem."""
+    mismatches = 0
+    for seed in range(n_frames):
+        df_tasks = make_tasks(n_tasks, seed)
+        expected = classify_rowwise(df_tasks, HOJE)
+        current = task_status.classify_tasks(df_tasks, HOJE)
+        for col in expected.columns:
+            same = expected[col].astype(object).tolist() == current[col].astype(object).tolist()
+            if not same:
+                mismatches += 1
+                print(f"DIVERGÊNCIA: classificação, tabela {seed}, coluna {col}")
+                break
+    print(f"classify_tasks: {n_frames} tabelas de {n_tasks} tarefas, {mismatches} divergência(s)")
+    return mismatches
+
+
+def make_projects(n_projects, df_tasks, seed):
+    """
+    Projetos com datas variadas; as tarefas (já classificadas) são distribuídas entre eles de
+    forma que existam projetos sem tarefas, só com concluídas, só com planejadas, só em andamento,
+    com atrasadas e sem status.
+    """
+    rng = random.Random(seed)
+    def some_date():
+        return pd.NaT if rng.random() < 0.35 else HOJE + pd.Timedelta(days=rng.randint(-120, 120))
+    df_projects = pd.DataFrame({'id': range(1, n_projects + 1), 'date_start': [some_date() for _ in range(n_projects)],
+                                'date': [some_date() for _ in range(n_projects)]})
+    df_tasks = df_tasks.copy()
+    kinds = ['empty', 'done', 'delayed', 'planned', 'active', 'no_status', 'mixed', 'mixed']
+    project_kind = {pid: kinds[pid % len(kinds)] for pid in df_projects['id']}
+    eligible = {kind: [pid for pid, k in project_kind.items() if k == kind] for kind in kinds}
+    assign = []
+    for status, is_delayed in zip(df_tasks['status_cat'], df_tasks['is_actually_delayed']):
+        if status == 'Concluída' and rng.random() < 0.3: kind = 'done'
+        elif is_delayed and rng.random() < 0.3: kind = 'delayed'
+        elif status == 'Planejada' and not is_delayed and rng.random() < 0.3: kind = 'planned'
+        elif status == 'Em Andamento' and not is_delayed and rng.random() < 0.3: kind = 'active'
+        else: kind = rng.choice(['no_status', 'mixed'])
+        assign.append(rng.choice(eligible[kind]))
+    df_tasks['project_id_id'] = assign
+    no_status = df_tasks['project_id_id'].map(project_kind).eq('no_status') & (pd.Series([rng.random() for _ in assign]) < 0.7)
+    df_tasks.loc[no_status, 'status_cat'] = None
+    df_tasks['calculated_start'] = [HOJE + pd.Timedelta(days=rng.randint(-200, 60)) if rng.random() < 0.9 else pd.NaT for _ in assign]
+    return df_projects, df_tasks
+
+
+def project_status_rowwise(df_projects, df_tasks, hoje):
+    """Status de cada projeto como generate_dept_gantt calculava: prazo final do Gantt + get_project_overall_status."""
+    statuses = []
+    for _, project_row in df_projects.iterrows():
+        tasks = df_tasks[df_tasks['project_id_id'] == project_row['id']]
+        starts = pd.to_datetime(tasks['calculated_start'], errors='coerce') if 'calculated_start' in tasks.columns else pd.Series(dtype='datetime64[ns]')
+        deadlines = pd.to_datetime(tasks['date_deadline'], errors='coerce')
+        p_start = project_row['date_start'] if pd.notna(project_row['date_start']) else \
+            (starts.min() if starts.notna().any() else hoje)
+        p_end = project_row['date'] if pd.notna(project_row['date']) else \
+            (deadlines.max() if deadlines.notna().any() else p_start + pd.Timedelta(days=1))
+        if p_end < p_start: p_end = p_start + pd.Timedelta(days=1)
+        statuses.append(task_status.get_project_overall_status(project_row, tasks, p_end, hoje))
+    return statuses
+
+
+def check_project_status(n_frames, n_tasks):
+    """Retorna a quantidade de tabelas em que as duas versões divergem (com e sem a coluna status_cat)."""
+    mismatches = 0
+    for seed in range(n_frames):
+        df_tasks = make_tasks(n_tasks, seed)
+        df_tasks = df_tasks.join(task_status.classify_tasks(df_tasks, HOJE))
+        df_projects, df_tasks = make_projects(max(12, n_tasks // 40), df_tasks, seed)
+        for variant, tasks in (('com status', df_tasks), ('sem coluna status_cat', df_tasks.drop(columns=['status_cat']))):
+            expected = project_status_rowwise(df_projects, tasks, HOJE)
+            current = task_status.project_overall_status(df_projects, tasks, HOJE).tolist()
+            if expected != current:
+                mismatches += 1
+                first = next(i for i, (a, b) in enumerate(zip(expected, current)) if a != b)
+                print(f"DIVERGÊNCIA: status de projeto, tabela {seed} ({variant}), projeto {df_projects['id'].iloc[first]}: "
+                      f"{expected[first]} x {current[first]}")
+    print(f"project_overall_status: {n_frames} tabelas de {n_tasks} tarefas (com e sem status_cat), {mismatches} divergência(s)")
+    return mismatches
+
+
+if __name__ == '__main__':
+    n_frames = int(sys.argv[1]) if len(sys.argv) > 1 else 30
+    n_tasks = int(sys.argv[2]) if len(sys.argv) > 2 else 2000
+    mismatches = check_classification(n_frames, n_tasks) + check_project_status(n_frames, n_tasks)
+    sys.exit(1 if mismatches else 0)
@@ -0,0 +1,234 @@
+"""
+Servidor JSON-RPC local que imita o Odoo o suficiente para o odoo_client (login do odoorpc,
+search, read, search_read, search_count e read_group), com dados sintéticos de
+project.project, project.tags e project.task em escala configurável: estágios com nome,
+árvores de subtarefas, cadeias de dependências dentro de cada projeto e write_date variados.
+
+Uso: python benchmarks/fake_odoo.py --port 18069 --tasks 10000 [--projects N] [--seed 1] [--latency 0.05]
+     e aponte o dashboard para ele (ODOO_HOST=127.0.0.1 ODOO_PORT=18069, qualquer banco/usuário/senha).
+"""
+import sys
+import json
+import time
+import random
+import argparse
+import threading
+from datetime import datetime, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+STAGES = [(1, 'Backlog'), (2, 'Em execução'), (3, 'Revisão'), (4, 'Concluído'), (5, 'Cancelado')]
+STATES = ['01_in_progress', '02_changes_requested', '03_approved', '04_waiting_normal', '1_done', '1_canceled']
+DEPARTMENTS = ['Elétrica', 'Civil', 'Mecânica', 'Automação', 'TI', 'Comercial']
+REFERENCE_DAY = datetime(2026, 1, 15) # Fixo: os mesmos parâmetros geram sempre os mesmos dados
+
+
+def _odoo_datetime(value):
+    return value.strftime('%Y-%m-%d %H:%M:%S') if value else False
+
+
+def generate_data(n_tasks, n_projects=None, seed=1):
+    """
+    Retorna {'project.project': [...], 'project.tags': [...], 'project.task': [...]} no formato
+    de leitura do Odoo ([id, 'nome'] nos many2one, False para vazio).
+    """
+    rng = random.Random(seed)
+    n_projects = n_projects or max(10, n_tasks // 100)
+    tags = [{'id': i, 'name': name} for i, name in enumerate(DEPARTMENTS, 1)]
+    projects = []
+    for pid in range(1, n_projects + 1):
+        projects.append({
+            'id': pid, 'name': f'Projeto {pid:05d} - Cliente {pid % 97}', 'active': True,
+            'date_start': (REFERENCE_DAY - timedelta(days=rng.randint(0, 300))).strftime('%Y-%m-%d') if rng.random() < .85 else False,
+            'date': (REFERENCE_DAY + timedelta(days=rng.randint(-60, 300))).strftime('%Y-%m-%d') if rng.random() < .7 else False,
+            'user_id': [2, 'Administrador'], 'task_count': 0, 'open_task_count': 0,
+            'tag_ids': [rng.randint(1, len(tags))] if rng.random() < .9 else [],
+        })
+    tasks, tasks_by_project = [], {}
+    for tid in range(1, n_tasks + 1):
+        pid = rng.randint(1, n_projects)
+        previous = tasks_by_project.setdefault(pid, [])
+        parent = rng.choice(previous[-50:]) if previous and rng.random() < .35 else None # Árvores de subtarefas
+        deps = []
+        if previous and rng.random() < .6:
+            deps.append(previous[-1]['id']) # Cadeia: depende da tarefa anterior do projeto
+            deps += [t['id'] for t in rng.sample(previous[-30:], min(len(previous[-30:]), rng.randint(0, 2)))]
+        stage = rng.choice(STAGES)
+        created = REFERENCE_DAY - timedelta(days=rng.randint(0, 300))
+        task = {
+            'id': tid, 'name': f'Tarefa {tid} - {stage[1].lower()}', 'active': True,
+            'create_date': _odoo_datetime(created),
+            'date_deadline': _odoo_datetime(created + timedelta(days=rng.randint(5, 200))) if rng.random() < .75 else False,
+            'date_end': _odoo_datetime(created + timedelta(days=rng.randint(5, 150))) if stage[0] == 4 and rng.random() < .5 else False,
+            'partner_id': [7, 'Cliente'] if rng.random() < .5 else False,
+            'project_id': [pid, projects[pid - 1]['name']], 'stage_id': list(stage),
+            'state': '1_done' if stage[0] == 4 else rng.choice(STATES),
+            'parent_id': [parent['id'], parent['name']] if parent else False,
+            'depend_on_ids': sorted(set(deps)),
+            'write_date': _odoo_datetime(REFERENCE_DAY - timedelta(days=rng.randint(0, 30), seconds=rng.randint(0, 86399))),
+        }
+        tasks.append(task)
+        previous.append(task)
+    for project in projects:
+        project_tasks = tasks_by_project.get(project['id'], [])
+        project['task_count'] = len(project_tasks)
+        project['open_task_count'] = sum(1 for t in project_tasks if t['state'] not in ('1_done', '1_canceled'))
+    return {'project.project': projects, 'project.tags': tags, 'project.task': tasks}
+
+
+class FakeOdoo:
+    """Dados em memória e a execução dos métodos do ORM que o dashboard usa."""
+    def __init__(self, data):
+        self.data = data
+        self.by_id = {model: {r['id']: r for r in records} for model, records in data.items()}
+        self.lock = threading.Lock()
+        self.calls = {} # (modelo, método) -> quantidade de chamadas
+
+    def _value(self, record, path):
+        if path == 'project_id.active':
+            return True
+        value = record.get(path, False)
+        if isinstance(value, list) and len(value) == 2 and isinstance(value[1], str):
+            return value[0] # many2one compara pelo ID
+        return value
+
+    def _match(self, record, domain):
+        stack = []
+        for item in reversed(domain):
+            if item in ('|', '&', '!'):
+                if item == '!':
+                    stack.append(not stack.pop())
+                else:
+                    a, b = stack.pop(), stack.pop()
+                    stack.append((a or b) if item == '|' else (a and b))
+                continue
+            field, operator, target = item
+            value = self._value(record, field)
+            if operator == '=': result = value == target
+            elif operator == '!=': result = value != target
+            elif operator == 'in': result = value in target
+            elif operator == 'not in': result = value not in target
+            elif operator in ('>', '>=', '<', '<='):
+                result = value not in (False, None) and {'>': value > target, '>=': value >= target,
+                                                         '<': value < target, '<=': value <= target}[operator]
+            else:
+                raise ValueError(f"Operador não suportado: {operator}")
+            stack.append(result)
+        return all(stack)
+
+    def _search(self, model, domain):
+        return [r for r in self.data[model] if self._match(r, domain)]
+
+    @staticmethod
+    def _fields(record, fields):
+        return {k: record.get(k, False) for k in ['id'] + [f for f in (fields or record.keys()) if f != 'id']}
+
+    def call(self, model, method, args, kwargs):
+        with self.lock:
+            self.calls[(model, method)] = self.calls.get((model, method), 0) + 1
+        if model == 'res.users':
+            return {'lang': 'pt_BR', 'tz': 'UTC', 'uid': 2} if method == 'context_get' else [{'id': 2, 'name': 'Administrador'}]
+        if method == 'fields_get': # O odoorpc consulta ao abrir env[modelo]
+            sample = self.data[model][0] if self.data[model] else {'id': 0}
+            return {name: {'type': 'integer' if name == 'id' else 'char', 'string': name} for name in sample}
+        domain = args[0] if args else kwargs.get('domain', [])
+        if method == 'search':
+            return [r['id'] for r in self._search(model, domain)]
+        if method == 'search_count':
+            return len(self._search(model, domain))
+        if method == 'read':
+            fields = args[1] if len(args) > 1 else kwargs.get('fields')
+            by_id = self.by_id[model]
+            return [self._fields(by_id[i], fields) for i in args[0] if i in by_id]
+        if method == 'search_read':
+            fields = args[1] if len(args) > 1 else kwargs.get('fields')
+            records = self._search(model, domain)
+            offset, limit = kwargs.get('offset', 0), kwargs.get('limit')
+            return [self._fields(r, fields) for r in records[offset:offset + limit if limit else None]]
+        if method == 'read_group':
+            groupby = kwargs.get('groupby') or args[2]
+            groupby = [groupby] if isinstance(groupby, str) else groupby
+            if kwargs.get('lazy', True):
+                groupby = groupby[:1]
+            groups = {}
+            for record in self._search(model, domain):
+                key = tuple(json.dumps(record.get(g, False)) for g in groupby)
+                groups[key] = groups.get(key, 0) + 1
+            result = []
+            for key, count in groups.items():
+                group = {g: json.loads(k) for g, k in zip(groupby, key)}
+                group['__count'] = count
+                group[f'{groupby[0]}_count'] = count
+                result.append(group)
+            return result
+        raise ValueError(f"Método não suportado: {model}.{method}")
+
+
+def make_handler(fake, latency=0):
+    class Handler(BaseHTTPRequestHandler):
+        def log_message(self, *args):
+            pass
+
+        def do_POST(self):
+            body = json.loads(self.rfile.read(int(self.headers['Content-Length'])))
+            params = body.get('params', {})
+            if latency:
+                time.sleep(latency) # Ida e volta de rede até um Odoo remoto
+            try:
+                result = self._dispatch(params)
+                response = {'jsonrpc': '2.0', 'id': body.get('id'), 'result': result}
+            except Exception as e:
+                response = {'jsonrpc': '2.0', 'id': body.get('id'),
+                            'error': {'code': 200, 'message': str(e), 'data': {'name': type(e).__name__, 'debug': '', 'message': str(e)}}}
+            data = json.dumps(response).encode()
+            self.send_response(200)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def _dispatch(self, params):
+            if self.path == '/web/webclient/version_info':
+                return {'server_version': '17.0', 'server_version_info': [17, 0, 0, 'final', 0, ''], 'protocol_version': 1}
+            if self.path == '/web/session/authenticate':
+                return {'uid': 2, 'user_context': {'lang': 'pt_BR', 'tz': 'UTC', 'uid': 2},
+                        'db': params.get('db'), 'username': params.get('login')}
+            if self.path == '/web/session/get_session_info':
+                return {'uid': 2}
+            if self.path == '/web/dataset/call_kw':
+                return fake.call(params['model'], params['method'], params.get('args', []), params.get('kwargs', {}))
+            if self.path == '/jsonrpc':
+                method = params.get('method')
+                if method == 'login':
+                    return 2
+                if method == 'version':
+                    return {'server_version': '17.0'}
+                if method in ('execute', 'execute_kw'):
+                    model, orm_method = params['args'][3:5]
+                    args = params['args'][5] if len(params['args']) > 5 else []
+                    kwargs = params['args'][6] if len(params['args']) > 6 else {}
+                    return fake.call(model, orm_method, args if method == 'execute_kw' else params['args'][5:], kwargs)
+            return {}
+    return Handler
+
+
+def serve(port, n_tasks, n_projects=None, seed=1, latency=0):
+    """Sobe o servidor (bloqueia). Retorna só quando o processo é encerrado."""
+    fake = FakeOdoo(generate_data(n_tasks, n_projects, seed))
+    server = ThreadingHTTPServer(('127.0.0.1', port), make_handler(fake, latency))
+    print(f"Odoo falso em http://127.0.0.1:{port}: {len(fake.data['project.project'])} projetos, "
+          f"{len(fake.data['project.task'])} tarefas", flush=True)
+    server.serve_forever()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--port', type=int, default=18069)
+    parser.add_argument('--tasks', type=int, default=1000)
+    parser.add_argument('--projects', type=int, default=None, help='padrão: 1 projeto a cada 100 tarefas (mínimo 10)')
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--latency', type=float, default=0, help='atraso (s) somado a cada requisição')
+    args = parser.parse_args()
+    try:
+        serve(args.port, args.tasks, args.projects, args.seed, args.latency)
+    except KeyboardInterrupt:
+        sys.exit(0)
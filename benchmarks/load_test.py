@@ -0,0 +1,118 @@
+"""
+Teste de carga do dashboard em execução (python app.py ou gunicorn app:server).
+
+Simula sessões simultâneas que repetem o que um usuário faz na página: escolher um
+departamento (Gantt do departamento + primeira página da tabela), abrir um projeto
+(Gantt do projeto + tabela) e ver o resumo. Cada sessão é uma thread fazendo as mesmas
+requisições POST /_dash-update-component que o navegador faria. Para cada quantidade de
+sessões mostra requisições por segundo e latências (mediana e p95).
+
+Uso: python benchmarks/load_test.py [URL] [--sessions 1,4,16,32] [--seconds 20]
+     (URL padrão: http://127.0.0.1:8050)
+"""
+import sys
+import json
+import time
+import random
+import argparse
+import threading
+import urllib.request
+
+
+def dash_call(base_url, outputs, inputs, state=()):
+    """Chama uma callback do Dash como o navegador; outputs/inputs/state são (id, propriedade[, valor])."""
+    outputs_spec = [{'id': oid, 'property': prop} for oid, prop in outputs]
+    if len(outputs) == 1:
+        output, outputs_spec = f"{outputs[0][0]}.{outputs[0][1]}", outputs_spec[0]
+    else:
+        output = '..' + '...'.join(f"{oid}.{prop}" for oid, prop in outputs) + '..'
+    body = {
+        'output': output, 'outputs': outputs_spec,
+        'inputs': [{'id': iid, 'property': prop, 'value': value} for iid, prop, value in inputs],
+        'changedPropIds': [f"{iid}.{prop}" for iid, prop, _ in inputs[:1]],
+        'state': [{'id': sid, 'property': prop, 'value': value} for sid, prop, value in state],
+    }
+    request = urllib.request.Request(base_url + '/_dash-update-component', data=json.dumps(body).encode(),
+                                     headers={'Content-Type': 'application/json'})
+    with urllib.request.urlopen(request, timeout=120) as response:
+        return json.loads(response.read() or b'{}')
+
+
+def gantt(base_url, dept, pid):
+    return dash_call(base_url, [('full-gantt', 'figure')],
+                     [('dept-dropdown', 'value', dept), ('project-dropdown', 'value', pid), ('snapshot-version', 'data', None)])
+
+
+def table(base_url, dept, pid, page=0):
+    return dash_call(base_url, [('tasks-table', 'data'), ('tasks-table', 'page_count'), ('tasks-table', 'page_current')],
+                     [('dept-dropdown', 'value', dept), ('project-dropdown', 'value', pid), ('snapshot-version', 'data', None),
+                      ('tasks-table', 'page_current', page), ('tasks-table', 'page_size', 10),
+                      ('tasks-table', 'sort_by', []), ('tasks-table', 'filter_query', '')])
+
+
+def summary(base_url):
+    return dash_call(base_url, [('summary-graph', 'figure')], [('tabs', 'value', 'tab-summary'), ('snapshot-version', 'data', None)])
+
+
+def discover(base_url):
+    """Departamentos e projetos disponíveis, pelas mesmas callbacks dos dropdowns."""
+    departments = dash_call(base_url, [('dept-dropdown', 'options')], [('snapshot-version', 'data', None)])
+    departments = [o['value'] for o in departments['response']['dept-dropdown']['options']]
+    projects = {}
+    for dept in departments:
+        response = dash_call(base_url, [('project-dropdown', 'options'), ('project-dropdown', 'value')],
+                             [('dept-dropdown', 'value', dept), ('snapshot-version', 'data', None)],
+                             [('project-dropdown', 'value', None)])
+        projects[dept] = [o['value'] for o in response['response']['project-dropdown']['options']]
+    return departments, projects
+
+
+def session(base_url, departments, projects, deadline, latencies, errors, seed):
+    rng = random.Random(seed)
+    while time.monotonic() < deadline:
+        dept = rng.choice(departments)
+        pid = rng.choice(projects[dept]) if projects[dept] else None
+        steps = [lambda: gantt(base_url, dept, None), lambda: table(base_url, dept, None)]
+        if pid is not None:
+            steps += [lambda: gantt(base_url, dept, pid), lambda: table(base_url, dept, pid)]
+        steps.append(lambda: summary(base_url))
+        for step in steps:
+            started = time.monotonic()
+            try:
+                step()
+                latencies.append(time.monotonic() - started)
+            except Exception:
+                errors.append(1)
+
+
+def percentile(values, q):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))] if ordered else float('nan')
+
+
+def run(base_url, n_sessions, seconds, departments, projects):
+    latencies, errors = [], []
+    deadline = time.monotonic() + seconds
+    threads = [threading.Thread(target=session, args=(base_url, departments, projects, deadline, latencies, errors, i))
+               for i in range(n_sessions)]
+    started = time.monotonic()
+    for t in threads: t.start()
+    for t in threads: t.join()
+    elapsed = time.monotonic() - started
+    print(f"{n_sessions:>4} sessões | {len(latencies) / elapsed:7.1f} req/s | mediana: {percentile(latencies, 0.5) * 1000:7.1f} ms | "
+          f"p95: {percentile(latencies, 0.95) * 1000:7.1f} ms | erros: {len(errors)}")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('url', nargs='?', default='http://127.0.0.1:8050')
+    parser.add_argument('--sessions', default='1,4,16,32', help='quantidades de sessões simultâneas, separadas por vírgula')
+    parser.add_argument('--seconds', type=float, default=20, help='duração de cada rodada')
+    args = parser.parse_args()
+    base_url = args.url.rstrip('/')
+    departments, projects = discover(base_url)
+    if not departments:
+        sys.exit("Nenhum departamento carregado: o dashboard já buscou os dados do Odoo?")
+    print(f"{len(departments)} departamentos, {sum(len(p) for p in projects.values())} projetos em {base_url}")
+    for n_sessions in [int(n) for n in args.sessions.split(',')]:
+        run(base_url, n_sessions, args.seconds, departments, projects)
@@ -0,0 +1,197 @@
+"""
+Suíte de benchmarks do caminho de atualização e de renderização, sem precisar do Odoo.
+
+Para cada escala (padrão: 1 mil, 10 mil e 100 mil tarefas) sobe o Odoo falso
+(benchmarks/fake_odoo.py) em um processo separado, importa o dashboard apontando para ele
+em outro processo e mede (mediana de --repeat execuções):
+
+    get_tasks                   leitura completa de project.task (odoo_client)
+    load_and_prepare_data       carga completa + preparação do snapshot
+    generate_full_gantt         Gantt do maior projeto
+    generate_dept_gantt         Gantt do maior departamento
+    update_tasks_table_callback primeira página da tabela do maior departamento
+    update_summary_callback     gráfico da aba Resumo
+
+e compara com a linha de base gravada (benchmarks/baseline.json), apontando regressões.
+Os tempos dependem da máquina: regrave a linha de base (--save-baseline) ao trocar de máquina.
+
+Uso: python benchmarks/run_benchmarks.py [--scales 1000,10000,100000] [--repeat 3]
+                                         [--tolerance 0.25] [--save-baseline]
+Sai com código 1 se houver regressão.
+"""
+import os
+import sys
+import json
+import time
+import socket
+import argparse
+import platform
+import statistics
+import subprocess
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_DIR = os.path.dirname(BENCH_DIR)
+BASELINE_PATH = os.path.join(BENCH_DIR, 'baseline.json')
+OPERATIONS = ['get_tasks', 'load_and_prepare_data', 'generate_full_gantt', 'generate_dept_gantt',
+              'update_tasks_table_callback', 'update_summary_callback']
+MIN_REGRESSION_SECONDS = 0.005 # Diferenças menores que isso são ruído, mesmo em proporção grande
+
+
+def _free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def _wait_port(port, process, timeout=600):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError("O Odoo falso terminou antes de abrir a porta.")
+        try:
+            with socket.create_connection(('127.0.0.1', port), timeout=1):
+                return
+        except OSError:
+            time.sleep(0.2)
+    raise RuntimeError(f"O Odoo falso não abriu a porta {port} em {timeout}s.")
+
+
+def _median_time(function, repeat):
+    durations = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        function()
+        durations.append(time.perf_counter() - started)
+    return statistics.median(durations)
+
+
+def measure(repeat):
+    """Executado no processo filho, já com as variáveis ODOO_* apontando para o Odoo falso."""
+    sys.path.insert(0, REPO_DIR)
+    import numpy as np
+    import app
+    import odoo_client
+
+    snapshot = app.snapshot_cache.get() # Importar o app não inicia a atualização em segundo plano: primeira carga aqui
+    if snapshot is None:
+        raise RuntimeError(f"O dashboard não carregou os dados do Odoo falso ({app.snapshot_cache.last_error}).")
+    largest_project = max(snapshot.tasks_by_project, key=lambda pid: len(snapshot.tasks_by_project[pid]))
+    largest_department = max(snapshot.projects_by_department, key=lambda d: len(snapshot.projects_by_department[d]))
+    project_positions = snapshot.tasks_by_project[largest_project]
+
+    def full_gantt():
+        # Mesma preparação de update_gantt_callback (sem o cache de figuras)
+        df_project_tasks = snapshot.tasks.iloc[project_positions].copy()
+        df_project_tasks['depend_on_ids_list'] = snapshot.dependency_ids(project_positions)
+        return app.generate_full_gantt(df_project_tasks, largest_project, snapshot.projects)
+
+    def dept_gantt():
+        return app.generate_dept_gantt(snapshot.tasks, snapshot.projects_in_department(largest_department),
+                                       show_tasks=False, tasks_by_project=snapshot.tasks_by_project)
+
+    def tasks_table():
+        app.table_order_cache.invalidate() # Sem o cache da ordem da tabela: mede a montagem completa
+        return app.update_tasks_table_callback(largest_department, None, snapshot.version, 0, 10, [], '')
+
+    operations = {
+        'get_tasks': odoo_client.get_tasks,
+        'load_and_prepare_data': lambda: app.load_and_prepare_data(full_reload=True),
+        'generate_full_gantt': full_gantt,
+        'generate_dept_gantt': dept_gantt,
+        'update_tasks_table_callback': tasks_table,
+        'update_summary_callback': lambda: app.update_summary_callback('tab-summary', snapshot.version),
+    }
+    results = {name: _median_time(operations[name], repeat) for name in OPERATIONS}
+    results['_info'] = {'tasks': len(snapshot.tasks), 'projects': len(snapshot.projects),
+                        'largest_project_tasks': int(len(project_positions)),
+                        'largest_department_projects': int(len(snapshot.projects_by_department[largest_department])),
+                        'dependencies': int(len(snapshot.dependencies.values)), 'numpy': np.__version__}
+    return results
+
+
+def run_scale(n_tasks, repeat):
+    """Sobe o Odoo falso e mede uma escala em processos separados; retorna {operação: segundos}."""
+    port = _free_port()
+    server = subprocess.Popen([sys.executable, os.path.join(BENCH_DIR, 'fake_odoo.py'), '--port', str(port), '--tasks', str(n_tasks)],
+                              stdout=subprocess.DEVNULL)
+    try:
+        _wait_port(port, server)
+        env = dict(os.environ, ODOO_HOST='127.0.0.1', ODOO_PORT=str(port), ODOO_DB='bench', ODOO_USER='bench',
+                   ODOO_PASSWORD='bench', SNAPSHOT_DIR='', TASK_SYNC_MODE='full')
+        worker = subprocess.run([sys.executable, os.path.abspath(__file__), '--measure', '--repeat', str(repeat)],
+                                env=env, cwd=REPO_DIR, capture_output=True, text=True)
+        if worker.returncode != 0:
+            raise RuntimeError(f"Medição de {n_tasks} tarefas falhou:\n{worker.stderr[-3000:]}")
+        return json.loads(worker.stdout.strip().splitlines()[-1])
+    finally:
+        server.terminate()
+        server.wait()
+
+
+def compare(results, baseline, tolerance):
+    """Imprime a comparação com a linha de base; retorna a lista de regressões."""
+    regressions = []
+    print(f"\n{'operação':<28} {'tarefas':>8} {'base (ms)':>10} {'atual (ms)':>11} {'razão':>7}")
+    for scale, timings in results.items():
+        base_timings = baseline.get('scales', {}).get(scale, {})
+        for name in OPERATIONS:
+            current = timings[name]
+            base = base_timings.get(name)
+            if base is None:
+                print(f"{name:<28} {scale:>8} {'-':>10} {current * 1000:11.1f} {'-':>7}")
+                continue
+            ratio = current / base if base else float('inf')
+            regressed = current > base * (1 + tolerance) and current - base > MIN_REGRESSION_SECONDS
+            flag = '  REGRESSÃO' if regressed else ('  melhorou' if current < base * (1 - tolerance) else '')
+            print(f"{name:<28} {scale:>8} {base * 1000:10.1f} {current * 1000:11.1f} {ratio:6.2f}x{flag}")
+            if regressed:
+                regressions.append((name, scale, base, current))
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--scales', default='1000,10000,100000', help='quantidades de tarefas, separadas por vírgula')
+    parser.add_argument('--repeat', type=int, default=3, help='execuções por operação (usa a mediana)')
+    parser.add_argument('--tolerance', type=float, default=0.25, help='aumento relativo aceito antes de apontar regressão')
+    parser.add_argument('--baseline', default=BASELINE_PATH)
+    parser.add_argument('--save-baseline', action='store_true', help='grava os tempos medidos como nova linha de base')
+    parser.add_argument('--measure', action='store_true', help=argparse.SUPPRESS) # Processo filho
+    args = parser.parse_args()
+
+    if args.measure:
+        print(json.dumps(measure(args.repeat)))
+        return 0
+
+    results = {}
+    for n_tasks in [int(n) for n in args.scales.split(',')]:
+        started = time.monotonic()
+        timings = run_scale(n_tasks, args.repeat)
+        info = timings.pop('_info')
+        results[str(n_tasks)] = timings
+        print(f"{n_tasks} tarefas ({info['projects']} projetos, {info['dependencies']} dependências; maior projeto: "
+              f"{info['largest_project_tasks']} tarefas, maior departamento: {info['largest_department_projects']} projetos) "
+              f"medidas em {time.monotonic() - started:.0f}s")
+
+    baseline = {}
+    if os.path.exists(args.baseline):
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+    regressions = compare(results, baseline, args.tolerance)
+
+    if args.save_baseline:
+        baseline.setdefault('scales', {}).update(results)
+        baseline['machine'] = f"{platform.machine()} / {os.cpu_count()} CPU / Python {platform.python_version()}"
+        baseline['recorded_at'] = time.strftime('%Y-%m-%d')
+        with open(args.baseline, 'w') as f:
+            json.dump(baseline, f, indent=2, sort_keys=True)
+            f.write('\n')
+        print(f"\nLinha de base gravada em {args.baseline}.")
+    elif regressions:
+        print(f"\n{len(regressions)} regressão(ões) acima de {args.tolerance:.0%} em relação a {args.baseline}.")
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
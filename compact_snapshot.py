@@ -0,0 +1,132 @@
+import numpy as np
+import pandas as pd
+
+# Esquema compacto da tabela de tarefas do snapshot. O que vem do Odoo já foi extraído em colunas
+# próprias (project_id_id, stage_id_name...), então os campos relacionais crus saem da tabela;
+# IDs viram inteiros anuláveis, textos repetidos viram categorias e as listas por linha
+# (dependências e implicações) ficam em arrays CSR. Os nomes das dependências/implicações só são
+# montados na hora de exibir, para as linhas exibidas.
+
+RAW_COLUMNS = ['project_id', 'stage_id', 'parent_id', 'depend_on_ids', 'partner_id']
+LIST_COLUMNS = ['depend_on_ids_list', 'depend_on_names', 'implications_ids', 'implications_names']
+ID_COLUMNS = ['parent_id_id', 'project_id_id', 'stage_id_id']
+CATEGORY_COLUMNS = ['stage_id_name', 'department', 'status_cat', 'name_project', 'project_id_name', 'state']
+
+
+def positions_of(task_ids, ids):
+    """Posição (linha) de cada ID em task_ids, -1 se não existir; com IDs repetidos vale a última linha."""
+    if task_ids.is_unique:
+        return task_ids.get_indexer(ids)
+    keep = np.flatnonzero(~task_ids.duplicated(keep='last'))
+    found = task_ids[keep].get_indexer(ids)
+    return np.where(found >= 0, keep[found], -1)
+
+
+class TaskEdges:
+    """
+    Listas de IDs por tarefa em formato CSR: os IDs da linha i (posição na tabela de tarefas)
+    são values[offsets[i]:offsets[i + 1]].
+    """
+    def __init__(self, offsets, values):
+        self.offsets = np.asarray(offsets, dtype=np.int64)
+        self.values = np.asarray(values, dtype=np.int64)
+
+    @classmethod
+    def from_lists(cls, lists):
+        """Monta a partir de uma sequência de listas de IDs (itens que não são listas contam como vazios)."""
+        lengths = np.fromiter((len(l) if isinstance(l, list) else 0 for l in lists), dtype=np.int64)
+        offsets = np.zeros(len(lengths) + 1, dtype=np.int64)
+        np.cumsum(lengths, out=offsets[1:])
+        values = np.fromiter((v for l in lists if isinstance(l, list) for v in l), dtype=np.int64, count=int(offsets[-1]))
+        return cls(offsets, values)
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    @property
+    def nbytes(self):
+        return self.offsets.nbytes + self.values.nbytes
+
+    def ids_of(self, position):
+        return self.values[self.offsets[position]:self.offsets[position + 1]].tolist()
+
+    def reversed(self, task_ids):
+        """
+        Arestas invertidas (implicações: quem depende de cada tarefa), em uma passada vetorizada.
+        task_ids é o pd.Index dos IDs das linhas; IDs fora dele (tarefas não carregadas) são
+        ignorados. Cada lista sai na ordem das linhas de origem.
+        """
+        n = len(self)
+        sources = np.repeat(np.arange(n, dtype=np.int64), np.diff(self.offsets))
+        targets = positions_of(task_ids, self.values)
+        known = targets >= 0
+        sources, targets = sources[known], targets[known]
+        order = np.argsort(targets, kind='stable') # Estável: mantém a ordem das linhas de origem
+        offsets = np.zeros(n + 1, dtype=np.int64)
+        np.cumsum(np.bincount(targets, minlength=n), out=offsets[1:])
+        return TaskEdges(offsets, task_ids.to_numpy(dtype=np.int64)[sources[order]])
+
+    def lists_for(self, positions):
+        """Listas Python de IDs para as posições pedidas (formato que os Gantts esperam)."""
+        offsets, values = self.offsets, self.values
+        return [values[offsets[p]:offsets[p + 1]].tolist() for p in positions]
+
+
+def compact_tasks(df_tasks):
+    """
+    Retorna (tarefas compactas, dependências, implicações). As posições das arestas CSR
+    correspondem às linhas da tabela retornada (índice 0..n-1); as implicações são calculadas
+    invertendo as dependências (a coluna 'implications_ids', se existir, é ignorada).
+    """
+    df = df_tasks.reset_index(drop=True)
+    dependencies = TaskEdges.from_lists(df['depend_on_ids_list']) if 'depend_on_ids_list' in df.columns \
+        else TaskEdges(np.zeros(len(df) + 1), [])
+    implications = dependencies.reversed(pd.Index(df['id'])) if 'id' in df.columns \
+        else TaskEdges(np.zeros(len(df) + 1), [])
+    df = df.drop(columns=[c for c in RAW_COLUMNS + LIST_COLUMNS if c in df.columns])
+    for col in ID_COLUMNS:
+        if col in df.columns:
+            df[col] = pd.to_numeric(df[col], errors='coerce').astype('Int64')
+    for col in CATEGORY_COLUMNS:
+        if col in df.columns:
+            df[col] = df[col].astype('category')
+    return df, dependencies, implications
+
+
+def resolve_names(edges, positions, task_ids, task_names):
+    """
+    Nomes das tarefas ligadas a cada posição pedida (ID sem tarefa carregada vira 'ID:<id>').
+    task_ids é o pd.Index dos IDs da tabela de tarefas e task_names o array de nomes na mesma ordem.
+    """
+    positions = np.asarray(positions, dtype=np.int64)
+    starts, ends = edges.offsets[positions], edges.offsets[positions + 1]
+    counts = ends - starts
+    if counts.sum() == 0:
+        return [[] for _ in range(len(positions))]
+    gather = np.concatenate([np.arange(s, e) for s, e in zip(starts, ends)]) if len(positions) else np.zeros(0, dtype=np.int64)
+    ids = edges.values[gather]
+    found = positions_of(task_ids, ids)
+    names = [task_names[f] if f >= 0 else f"ID:{i}" for f, i in zip(found.tolist(), ids.tolist())]
+    bounds = np.concatenate([[0], np.cumsum(counts)]).tolist()
+    return [names[bounds[k]:bounds[k + 1]] for k in range(len(positions))]
+
+
+def frame_memory(df):
+    """Bytes ocupados pelo DataFrame (incluindo o conteúdo de colunas object)."""
+    return int(df.memory_usage(deep=True, index=True).sum())
+
+
+def memory_report(df_full, df_compact, dependencies, implications):
+    """Compara a tabela de tarefas completa (uma lista Python por linha) com a compacta."""
+    before = frame_memory(df_full)
+    after = frame_memory(df_compact) + dependencies.nbytes + implications.nbytes
+    per_10k = 10000 / max(1, len(df_full))
+    return {
+        'tasks': len(df_full),
+        'before_bytes': before,
+        'after_bytes': after,
+        'before_mb_per_10k': before * per_10k / 2**20,
+        'after_mb_per_10k': after * per_10k / 2**20,
+        'columns_before': df_full.memory_usage(deep=True, index=False).sort_values(ascending=False),
+        'columns_after': df_compact.memory_usage(deep=True, index=False).sort_values(ascending=False),
+    }
@@ -0,0 +1,46 @@
+import threading
+from collections import OrderedDict
+
+
+class FigureCache:
+    """
+    Cache LRU de figuras já montadas (Gantt de projeto/departamento) e de outros resultados
+    derivados do snapshot (ex.: ordem das linhas da tabela de tarefas).
+
+    A chave deve incluir a versão do snapshot, o que está sendo exibido (projeto ou
+    departamento) e as opções de visualização. Quando o número de figuras passa de
+    'max_entries', as menos usadas recentemente são descartadas. invalidate() limpa
+    tudo e é chamado sempre que um novo snapshot é publicado.
+    As figuras devolvidas são compartilhadas entre sessões e não devem ser alteradas.
+    """
+    def __init__(self, max_entries=64):
+        self.max_entries = max(1, max_entries)
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get_or_build(self, key, builder):
+        """Retorna a figura da chave; se não existir, chama builder() e guarda o resultado."""
+        with self._lock:
+            fig = self._entries.get(key)
+            if fig is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return fig
+            self.misses += 1
+        fig = builder() # Montagem fora do lock: outras sessões não ficam esperando
+        with self._lock:
+            self._entries[key] = fig
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return fig
+
+    def invalidate(self, *_):
+        """Descarta todas as figuras (aceita e ignora argumentos para servir de listener)."""
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
@@ -0,0 +1,23 @@
+import os
+
+# Configuração do gunicorn para produção: gunicorn app:server (o dockerfile já usa este arquivo).
+# Cada worker é um processo com o próprio cache de snapshot e de figuras; só um deles consulta o
+# Odoo e grava o snapshot em SNAPSHOT_DIR, os outros o leem de lá (ver snapshot_store.start_shared_refresh).
+# As threads de cada worker atendem várias sessões ao mesmo tempo: um Gantt pesado não trava as demais.
+
+bind = os.getenv("GUNICORN_BIND", "0.0.0.0:8050")
+workers = int(os.getenv("GUNICORN_WORKERS", 2))
+threads = int(os.getenv("GUNICORN_THREADS", 8))
+worker_class = "gthread"
+timeout = int(os.getenv("GUNICORN_TIMEOUT", 120))
+graceful_timeout = 30
+# Cada worker importa o app depois do fork: as threads de atualização precisam existir em cada processo
+preload_app = False
+accesslog = None
+errorlog = "-"
+
+
+def post_worker_init(worker):
+    # As threads de atualização são iniciadas aqui, já no processo do worker (importar o app não as inicia)
+    import app
+    app.start_background_work()
@@ -0,0 +1,159 @@
+import time
+import threading
+import functools
+from contextlib import contextmanager
+
+# Métricas do processo no formato texto do Prometheus (servidas em /metrics pelo app.py).
+# Contadores e histogramas com rótulos, sem dependências externas. Nomes terminados em
+# '_seconds' são histogramas; em '_total', contadores. Valores lidos na hora da coleta
+# (ex.: estado do pool de conexões) entram por add_collector().
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120)
+
+
+def _label_key(labels):
+    return tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+
+def _format_labels(label_key, extra=()):
+    items = list(label_key) + list(extra)
+    if not items:
+        return ''
+    escaped = [k + '="' + v.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n') + '"' for k, v in items]
+    return '{' + ','.join(escaped) + '}'
+
+
+def _format_value(value):
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+class MetricsRegistry:
+    """Registro de métricas seguro entre threads."""
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = tuple(buckets)
+        self._lock = threading.Lock()
+        self._help = {}
+        self._counters = {}   # nome -> {rótulos: valor}
+        self._histograms = {} # nome -> {rótulos: [contagens por bucket, soma, total]}
+        self._collectors = []
+
+    def describe(self, name, help_text):
+        """Texto de ajuda (# HELP) da métrica."""
+        self._help[name] = help_text
+
+    def inc(self, name, value=1, **labels):
+        """Soma 'value' ao contador 'name' (deve terminar em _total)."""
+        key = _label_key(labels)
+        with self._lock:
+            series = self._counters.setdefault(name, {})
+            series[key] = series.get(key, 0) + value
+
+    def observe(self, name, value, **labels):
+        """Registra uma observação (ex.: duração em segundos) no histograma 'name'."""
+        key = _label_key(labels)
+        with self._lock:
+            series = self._histograms.setdefault(name, {})
+            state = series.get(key)
+            if state is None:
+                state = series[key] = [[0] * len(self.buckets), 0.0, 0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    state[0][i] += 1
+            state[1] += value
+            state[2] += 1
+
+    def add_collector(self, collector):
+        """
+        Registra collector(), chamado a cada coleta. Deve retornar uma lista de
+        (nome, tipo 'gauge' ou 'counter', rótulos (dict), valor).
+        """
+        self._collectors.append(collector)
+
+    def render(self):
+        """Todas as métricas no formato de exposição em texto do Prometheus."""
+        lines = []
+        def header(name, kind):
+            if name in self._help:
+                lines.append(f"# HELP {name} {self._help[name]}")
+            lines.append(f"# TYPE {name} {kind}")
+        with self._lock:
+            counters = {name: dict(series) for name, series in self._counters.items()}
+            histograms = {name: {k: [list(v[0]), v[1], v[2]] for k, v in series.items()} for name, series in self._histograms.items()}
+        for name in sorted(counters):
+            header(name, 'counter')
+            for key, value in sorted(counters[name].items()):
+                lines.append(f"{name}{_format_labels(key)} {_format_value(value)}")
+        for name in sorted(histograms):
+            header(name, 'histogram')
+            for key, (bucket_counts, total, count) in sorted(histograms[name].items()):
+                for bound, bucket_count in zip(self.buckets, bucket_counts):
+                    lines.append(f"{name}_bucket{_format_labels(key, [('le', _format_value(bound))])} {bucket_count}")
+                lines.append(f"{name}_bucket{_format_labels(key, [('le', '+Inf')])} {count}")
+                lines.append(f"{name}_sum{_format_labels(key)} {_format_value(total)}")
+                lines.append(f"{name}_count{_format_labels(key)} {count}")
+        collected = {}
+        for collector in self._collectors:
+            try:
+                for name, kind, labels, value in collector():
+                    collected.setdefault((name, kind), []).append((_label_key(labels), value))
+            except Exception as e:
+                print(f"ATENÇÃO: Erro ao coletar métricas: {type(e).__name__} - {e}")
+        for (name, kind), samples in sorted(collected.items()):
+            header(name, kind)
+            for key, value in samples:
+                lines.append(f"{name}{_format_labels(key)} {_format_value(value)}")
+        return '\n'.join(lines) + '\n'
+
+
+registry = MetricsRegistry()
+
+
+@contextmanager
+def span(metric, **labels):
+    """
+    Mede o bloco e registra em '<metric>_seconds' (histograma). O dicionário devolvido aceita
+    quantidades do bloco (ex.: info['rows'] = 10), somadas em '<metric>_<chave>_total'.
+    Exceções contam em '<metric>_errors_total' e são repassadas.
+    """
+    info = {}
+    started = time.perf_counter()
+    try:
+        yield info
+    except Exception:
+        registry.inc(f"{metric}_errors_total", **labels)
+        raise
+    finally:
+        registry.observe(f"{metric}_seconds", time.perf_counter() - started, **labels)
+        for key, value in info.items():
+            registry.inc(f"{metric}_{key}_total", value, **labels)
+
+
+def timed(metric, **labels):
+    """Decorador: mede cada chamada da função com span(metric, **labels)."""
+    def decorator(function):
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            with span(metric, **labels):
+                return function(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def timed_callback(function):
+    """Decorador das callbacks do Dash: duração total por callback (rótulo = nome da função)."""
+    return timed('dashboard_callback', callback=function.__name__)(function)
+
+
+class StageTimer:
+    """
+    Mede etapas consecutivas de um processamento: mark('etapa') registra em
+    '<name>_seconds{stage="etapa"}' o tempo desde a marca anterior (ou desde a criação).
+    """
+    def __init__(self, name):
+        self.name = name
+        self._last = time.perf_counter()
+
+    def mark(self, stage):
+        now = time.perf_counter()
+        registry.observe(f"{self.name}_seconds", now - self._last, stage=stage)
+        self._last = now
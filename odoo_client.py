@@ -1,7 +1,16 @@
 from dotenv import load_dotenv
 import os
+import threading
+import time
+import queue
+import urllib.error
+import urllib.request
+from http.cookiejar import CookieJar
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor
 import odoorpc
 import pandas as pd
+import metrics
 
 load_dotenv()
 
@@ -10,81 +19,450 @@ PORT = os.getenv("ODOO_PORT", 8069) # Usa 8069 como porta padrão se não defini
 DB = os.getenv("ODOO_DB")
 USER = os.getenv("ODOO_USER")
 PASS = os.getenv("ODOO_PASSWORD")
+BATCH_SIZE = int(os.getenv("ODOO_BATCH_SIZE", 2000)) # Registros por chamada 'read' nas leituras paginadas
+READ_WORKERS = int(os.getenv("ODOO_READ_WORKERS", 4)) # Leituras paralelas (uma conexão autenticada por thread)
+KEEPALIVE_SECONDS = int(os.getenv("ODOO_KEEPALIVE_SECONDS", 300)) # Intervalo do keep-alive em segundo plano (0 desativa)
+# Conexões logadas mantidas pelo pool: os blocos de tarefas + as leituras simultâneas da atualização
+POOL_SIZE = int(os.getenv("ODOO_POOL_SIZE", READ_WORKERS + 4))
+POOL_TIMEOUT = int(os.getenv("ODOO_POOL_TIMEOUT", 60)) # Espera máxima (s) por uma conexão livre
+
+# Modo de sincronização das tarefas: 'incremental' (padrão) ou 'full' (recarga completa a cada atualização)
+TASK_SYNC_MODE = os.getenv("TASK_SYNC_MODE", "incremental").lower()
+
+TASK_DOMAIN = [("project_id.active", "=", True)] # Busca tarefas de projetos ativos
+TASK_FIELDS = [
+    "id", "name", "create_date", "date_deadline", "date_end", "partner_id",
+    "project_id", "stage_id", "state", "active", "parent_id", "depend_on_ids", "write_date"
+]
+# Modo de carga das tarefas: 'eager' (padrão: todos os campos a cada atualização) ou 'lazy'
+# (a atualização lê só o resumo abaixo; o detalhe de um projeto é lido quando ele é exibido, ver task_details.py)
+TASK_DETAIL_MODE = os.getenv("TASK_DETAIL_MODE", "eager").lower()
+# Origem da contagem de tarefas por status da aba Resumo: 'local' (padrão: agrupa as tarefas do
+# snapshot) ou 'odoo' (read_group no servidor, ver get_task_status_groups)
+SUMMARY_SOURCE = os.getenv("SUMMARY_SOURCE", "local").lower()
+# write_date não é exibido, mas é a marca d'água da sincronização incremental
+TASK_SUMMARY_FIELDS = ["id", "project_id", "stage_id", "state", "date_deadline", "write_date"]
+
+def task_refresh_fields():
+    """Campos de project.task lidos a cada atualização do snapshot (dependem de TASK_DETAIL_MODE)."""
+    return TASK_SUMMARY_FIELDS if TASK_DETAIL_MODE == 'lazy' else TASK_FIELDS
+
+# Estado da sincronização incremental: tabela de tarefas em memória, a marca d'água de write_date,
+# o número sequencial da tabela atual ('seq') e o que mudou na última chamada ('last_sync')
+_task_sync_lock = threading.Lock()
+_task_sync_state = {'df': None, 'watermark': None, 'seq': 0, 'last_sync': None}
+
+def _is_reconnect_error(e):
+    """True se o erro indica sessão/login inválido ou conexão perdida (vale relogar e tentar de novo)."""
+    if isinstance(e, odoorpc.error.RPCError):
+        fault_code_str = str(getattr(e, 'faultCode', '')).lower()
+        error_message_str = str(getattr(e, 'message', str(e))).lower()
+
+        # Condições comuns para erros de sessão/login
+        session_errors = ["session", "login", "authent", "zugriff verweigert", "access denied", "login required"]
+
+        return any(err_key in fault_code_str for err_key in session_errors) or \
+               any(err_key in error_message_str for err_key in session_errors)
+    # Conexão perdida (Odoo reiniciado, proxy caiu...). Timeouts não são repetidos para não dobrar a espera.
+    return isinstance(e, (ConnectionError, urllib.error.URLError)) and not isinstance(getattr(e, 'reason', None), TimeoutError)
+
+
+_rpc_bytes = threading.local() # Bytes recebidos do Odoo pela thread atual (somados pelo _ResponseSizeHandler)
+
+class _ResponseSizeHandler(urllib.request.BaseHandler):
+    """
+    Soma por thread o tamanho do corpo das respostas do Odoo efetivamente lido, para as métricas
+    de RPC. O Content-Length não serve: não vem em respostas chunked ou compactadas.
+    """
+    def http_response(self, request, response):
+        read = response.read
+        def counting_read(*args, **kwargs):
+            data = read(*args, **kwargs)
+            _rpc_bytes.total = getattr(_rpc_bytes, 'total', 0) + len(data)
+            return data
+        response.read = counting_read
+        return response
+
+    https_response = http_response
+
+
+@contextmanager
+def _rpc_span(model_name, method):
+    """
+    Mede uma chamada ao Odoo (dashboard_odoo_rpc_seconds{model, method}), com os bytes recebidos;
+    quem chama informa a quantidade de registros em info['rows'].
+    """
+    bytes_before = getattr(_rpc_bytes, 'total', 0)
+    with metrics.span('dashboard_odoo_rpc', model=model_name, method=method) as info:
+        try:
+            yield info
+        finally:
+            info['bytes'] = getattr(_rpc_bytes, 'total', 0) - bytes_before
 
-# Variável global para a instância ODOO, para reutilizar a conexão
-_odoo_instance = None
 
 def _connect_and_login():
     """
     Estabelece uma nova conexão com o Odoo e realiza o login.
     Retorna a instância Odoo conectada ou None em caso de falha.
     """
-    global _odoo_instance
     try:
         print("INFO: Tentando conectar e logar no Odoo...")
-        _odoo_instance = odoorpc.ODOO(host=HOST, protocol='jsonrpc', port=int(PORT), timeout=60)
-        _odoo_instance.login(DB, USER, PASS)
+        # Mesmo opener padrão do odoorpc (cookies da sessão), mais a contagem de bytes das respostas
+        opener = urllib.request.build_opener(urllib.request.HTTPCookieProcessor(CookieJar()), _ResponseSizeHandler())
+        odoo = odoorpc.ODOO(host=HOST, protocol='jsonrpc', port=int(PORT), timeout=60, opener=opener)
+        with _rpc_span('res.users', 'login'):
+            odoo.login(DB, USER, PASS)
         print("INFO: Conexão e login com Odoo bem-sucedidos.")
-        return _odoo_instance
+        return odoo
     except Exception as e:
         print(f"ATENÇÃO: Falha crítica ao conectar/logar no Odoo: {e}")
-        _odoo_instance = None # Garante que não tentaremos usar uma instância falha
         return None
 
-def get_odoo_env():
+
+class OdooConnectionPool:
     """
-    Retorna o ambiente 'env' da conexão Odoo.
-    Tenta (re)conectar e (re)logar se a conexão não existir ou a sessão estiver inválida.
+    Pool de instâncias odoorpc.ODOO já logadas, seguro para uso entre threads.
+
+    As conexões são criadas sob demanda até 'size' e emprestadas com o gerenciador de
+    contexto connection(). Uma conexão que falha por sessão/conexão é descartada e
+    relogada em segundo plano, sem bloquear quem está lendo. O tempo de espera por uma
+    conexão livre é acumulado em stats().
     """
-    global _odoo_instance
-    if _odoo_instance is None:
-        if not _connect_and_login(): # Tenta conectar na primeira vez ou se _odoo_instance foi resetado
-            return None
+    def __init__(self, size=POOL_SIZE, acquire_timeout=POOL_TIMEOUT):
+        self.size = max(1, size)
+        self.acquire_timeout = acquire_timeout
+        self._idle = queue.LifoQueue() # LIFO: reutiliza as conexões mais "quentes"
+        self._lock = threading.Lock()
+        self._slots = 0 # Conexões existentes ou em (re)login
+        self._relogins = 0
+        self._wait_count = 0
+        self._wait_total = 0.0
+        self._wait_max = 0.0
 
-    try:
-        # Tenta uma chamada leve para verificar se a sessão ainda é válida
-        _odoo_instance.version() 
-        return _odoo_instance.env
-    except Exception as e: 
-        # Qualquer exceção aqui (RPCError, ConnectionRefusedError, etc.) indica problema.
-        print(f"INFO: Sessão Odoo possivelmente inválida ou conexão perdida ({type(e).__name__}: {e}). Tentando relogar...")
-        if not _connect_and_login(): # Tenta reconectar e logar
-            return None # Falha ao relogar
-        # Se o relogin foi bem-sucedido, retorna o novo ambiente
-        return _odoo_instance.env if _odoo_instance else None
+    def _acquire(self):
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            pass
+        with self._lock:
+            can_create = self._slots < self.size
+            if can_create:
+                self._slots += 1
+        if can_create:
+            odoo = _connect_and_login()
+            if odoo is None:
+                with self._lock:
+                    self._slots -= 1
+                raise ConnectionError("Não foi possível conectar/logar no Odoo.")
+            return odoo
+        try:
+            return self._idle.get(timeout=self.acquire_timeout)
+        except queue.Empty:
+            raise TimeoutError(f"Nenhuma conexão Odoo livre após {self.acquire_timeout}s (pool com {self.size}).")
+
+    def _record_wait(self, waited):
+        with self._lock:
+            self._wait_count += 1
+            self._wait_total += waited
+            self._wait_max = max(self._wait_max, waited)
+        if waited > 1:
+            print(f"INFO: Espera de {waited:.1f}s por uma conexão livre no pool do Odoo.")
+
+    @contextmanager
+    def connection(self):
+        """Empresta uma conexão logada; devolve ao pool ao sair ou a descarta se a sessão falhou."""
+        started = time.monotonic()
+        odoo = self._acquire()
+        self._record_wait(time.monotonic() - started)
+        try:
+            yield odoo
+        except Exception as e:
+            if _is_reconnect_error(e):
+                self._discard()
+            else:
+                self._idle.put(odoo)
+            raise
+        else:
+            self._idle.put(odoo)
+
+    def _discard(self):
+        """Substitui uma conexão falha por uma nova, logada em segundo plano."""
+        with self._lock:
+            self._relogins += 1
+        threading.Thread(target=self._relogin_member, name='odoo-pool-relogin', daemon=True).start()
+
+    def _relogin_member(self):
+        for delay in (0, 5, 15):
+            time.sleep(delay)
+            odoo = _connect_and_login()
+            if odoo is not None:
+                self._idle.put(odoo)
+                return
+        # Odoo continua indisponível: libera a vaga; a próxima leitura tenta conectar por conta própria
+        with self._lock:
+            self._slots -= 1
+
+    def drop_idle(self):
+        """Descarta as conexões ociosas (ex.: após queda do Odoo); novas serão criadas sob demanda."""
+        dropped = 0
+        while True:
+            try:
+                self._idle.get_nowait()
+            except queue.Empty:
+                break
+            dropped += 1
+        with self._lock:
+            self._slots -= dropped
+
+    def ping_idle(self):
+        """Keep-alive: testa as conexões ociosas com uma chamada autenticada barata."""
+        for _ in range(self._idle.qsize()):
+            try:
+                odoo = self._idle.get_nowait()
+            except queue.Empty:
+                return
+            try:
+                with _rpc_span('res.users', 'context_get'):
+                    odoo.execute('res.users', 'context_get')
+                self._idle.put(odoo)
+            except Exception as e:
+                print(f"INFO: Keep-alive do Odoo falhou ({type(e).__name__}: {e}). Relogando conexão em segundo plano...")
+                self._discard()
+
+    def stats(self):
+        """Métricas do pool, incluindo o tempo de espera por conexões."""
+        with self._lock:
+            return {
+                'size': self.size, 'connections': self._slots, 'idle': self._idle.qsize(),
+                'relogins': self._relogins, 'waits': self._wait_count,
+                'wait_total_seconds': self._wait_total, 'wait_max_seconds': self._wait_max,
+            }
+
+
+_pool = OdooConnectionPool()
+
+def get_pool():
+    """Retorna o pool de conexões Odoo compartilhado pelo processo."""
+    return _pool
+
+
+def _pool_metrics():
+    """Estado do pool de conexões e falhas de leitura, lidos a cada coleta de /metrics."""
+    stats = _pool.stats()
+    return [
+        ('dashboard_odoo_pool_size', 'gauge', {}, stats['size']),
+        ('dashboard_odoo_pool_connections', 'gauge', {}, stats['connections']),
+        ('dashboard_odoo_pool_idle', 'gauge', {}, stats['idle']),
+        ('dashboard_odoo_pool_relogins_total', 'counter', {}, stats['relogins']),
+        ('dashboard_odoo_pool_waits_total', 'counter', {}, stats['waits']),
+        ('dashboard_odoo_pool_wait_seconds_total', 'counter', {}, stats['wait_total_seconds']),
+        ('dashboard_odoo_pool_wait_max_seconds', 'gauge', {}, stats['wait_max_seconds']),
+        ('dashboard_odoo_read_failures_total', 'counter', {}, read_failure_count()),
+    ]
+
+metrics.registry.add_collector(_pool_metrics)
+metrics.registry.describe('dashboard_odoo_rpc_seconds', 'Duração das chamadas ao Odoo por modelo e método.')
+metrics.registry.describe('dashboard_odoo_rpc_rows_total', 'Registros recebidos do Odoo por modelo e método.')
+metrics.registry.describe('dashboard_odoo_rpc_bytes_total', 'Bytes recebidos do Odoo (corpo das respostas) por modelo e método.')
+metrics.registry.describe('dashboard_odoo_rpc_errors_total', 'Chamadas ao Odoo que terminaram em erro.')
+
+
+def _keepalive_loop(interval_seconds):
+    """Mantém as sessões vivas e detecta quedas fora do caminho das leituras."""
+    while True:
+        time.sleep(interval_seconds)
+        _pool.ping_idle()
+
+_keepalive_thread = None
+_keepalive_lock = threading.Lock()
+
+def start_keepalive(interval_seconds=None):
+    """Inicia (uma única vez por processo) a thread de keep-alive das conexões Odoo."""
+    global _keepalive_thread
+    interval_seconds = KEEPALIVE_SECONDS if interval_seconds is None else interval_seconds
+    if interval_seconds <= 0:
+        return
+    with _keepalive_lock:
+        if _keepalive_thread is None:
+            _keepalive_thread = threading.Thread(target=_keepalive_loop, args=(interval_seconds,), name='odoo-keepalive', daemon=True)
+            _keepalive_thread.start()
+
+
+# Pool de threads das leituras paginadas; cada bloco usa uma conexão emprestada do pool
+_read_executor = None
+_read_executor_lock = threading.Lock()
+
+def _get_read_executor():
+    global _read_executor
+    with _read_executor_lock:
+        if _read_executor is None:
+            _read_executor = ThreadPoolExecutor(max_workers=max(1, READ_WORKERS), thread_name_prefix='odoo-read')
+    return _read_executor
+
+def _read_chunk(model_name, ids, fields, context):
+    """Lê um bloco de IDs com uma conexão emprestada do pool."""
+    with _pool.connection() as odoo, _rpc_span(model_name, 'read') as rpc:
+        records = odoo.env[model_name].read(ids, fields, context=context)
+        rpc['rows'] = len(records)
+        return records
+
+def _iter_odoo_read(model_name, domain, fields, context):
+    """
+    Busca os IDs com um 'search' e lê os registros em blocos de até BATCH_SIZE.
+    Os blocos são lidos em paralelo, mas entregues (yield) na ordem do 'search'.
+    Nenhuma conexão fica presa enquanto se espera por outra (evita deadlock no pool).
+    """
+    with _pool.connection() as odoo, _rpc_span(model_name, 'search') as rpc:
+        ids = odoo.env[model_name].search(domain, context=context)
+        rpc['rows'] = len(ids or [])
+    if not ids:
+        return
+    if len(ids) <= BATCH_SIZE: # Um único bloco: lê direto, sem passar pelas threads
+        yield _read_chunk(model_name, ids, fields, context)
+        return
+    chunks = [ids[i:i + BATCH_SIZE] for i in range(0, len(ids), BATCH_SIZE)]
+    n_chunks = len(chunks)
+    yield from _get_read_executor().map(_read_chunk, [model_name] * n_chunks, chunks, [fields] * n_chunks, [context] * n_chunks)
+
+def _handle_read_error(model_name, e):
+    """
+    Registra o erro de leitura. Retorna True se for um problema de sessão/login ou de
+    conexão (a conexão já foi descartada pelo pool e vale tentar de novo).
+    """
+    if isinstance(e, odoorpc.error.RPCError):
+        print(f"ATENÇÃO: RPCError ao buscar dados de {model_name}: {getattr(e, 'message', str(e))} (Fault Code: {getattr(e, 'faultCode', 'N/A')})")
+        if _is_reconnect_error(e):
+            print(f"INFO: Erro de sessão detectado para {model_name}. Tentando novamente com outra conexão.")
+            return True
+        return False
+    if _is_reconnect_error(e):
+        print(f"INFO: Conexão com o Odoo perdida ao buscar {model_name} ({type(e).__name__}: {e}). Tentando reconectar.")
+        return True
+    print(f"ATENÇÃO: Erro genérico ao buscar dados de {model_name}: {type(e).__name__} - {e}")
+    return False
+
+
+class OdooUnavailableError(Exception):
+    """Não foi possível ler os dados do Odoo (fora do ar, lento demais ou credenciais inválidas)."""
+
+
+_READ_FAILED = object()
+_read_failures = 0
+_read_failures_lock = threading.Lock()
+_thread_failures = threading.local() # Falhas das leituras feitas pela thread atual (ver read_concurrently)
+
+def read_failure_count():
+    """Total de leituras que falharam desde o início do processo (exportado nas métricas)."""
+    return _read_failures
+
+def _thread_failure_count():
+    """
+    Leituras que falharam na thread atual. Como as leituras retornam vazio em caso de erro, quem
+    precisa diferenciar 'sem dados' de 'falha' compara este contador antes e depois das suas
+    leituras; o total do processo não serve, pois inclui falhas de leituras de outras threads.
+    """
+    return getattr(_thread_failures, 'count', 0)
+
+def _run_odoo_read(model_name, operation):
+    """
+    Executa operation() (que empresta conexões do pool). Em caso de erro de sessão/conexão,
+    tenta mais uma vez com outra conexão. Retorna _READ_FAILED se não for possível ler.
+    """
+    global _read_failures
+    for attempt in range(2):
+        try:
+            return operation()
+        except Exception as e:
+            if not _handle_read_error(model_name, e):
+                break
+            _pool.drop_idle() # As demais conexões ociosas provavelmente também estão inválidas
+    with _read_failures_lock:
+        _read_failures += 1
+    _thread_failures.count = _thread_failure_count() + 1
+    return _READ_FAILED
 
 
 def execute_odoo_read(model_name, domain, fields, context=None):
     """
-    Executa um search_read no Odoo de forma segura, lidando com problemas de sessão.
+    Executa uma leitura paginada (search + read em blocos) no Odoo de forma segura,
+    lidando com problemas de sessão.
     Retorna os dados ou uma lista vazia em caso de erro.
     """
-    env = get_odoo_env()
-    if not env:
-        print(f"ATENÇÃO: Não foi possível obter o ambiente Odoo para o modelo {model_name}.")
-        return [] 
+    # print(f"INFO: Buscando dados para o modelo {model_name}...") # Descomente para debug detalhado
+    data = _run_odoo_read(model_name, lambda: [
+        record for chunk in _iter_odoo_read(model_name, domain, fields, context or {}) for record in chunk
+    ])
+    return [] if data is _READ_FAILED else data
+
+
+def read_odoo_frame(model_name, domain, fields, context=None):
+    """
+    Igual a execute_odoo_read, mas monta o DataFrame bloco a bloco à medida que as leituras
+    chegam, sem acumular a lista completa de dicionários em memória.
+    Retorna um DataFrame vazio em caso de erro.
+    """
+    frames = _run_odoo_read(model_name, lambda: [
+        pd.DataFrame(chunk) for chunk in _iter_odoo_read(model_name, domain, fields, context or {})
+    ])
+    if frames is _READ_FAILED or not frames:
+        return pd.DataFrame()
+    return frames[0] if len(frames) == 1 else pd.concat(frames, ignore_index=True)
+
+
+def execute_odoo_search(model_name, domain, context=None):
+    """
+    Executa um search (somente IDs) no Odoo. É bem mais leve que um search_read.
+    Retorna a lista de IDs ou None em caso de erro (para diferenciar de 'nenhum registro').
+    """
+    def search_ids():
+        with _pool.connection() as odoo, _rpc_span(model_name, 'search') as rpc:
+            ids = odoo.env[model_name].search(domain, context=context or {}) or []
+            rpc['rows'] = len(ids)
+            return ids
+    ids = _run_odoo_read(model_name, search_ids)
+    return None if ids is _READ_FAILED else ids
+
+
+def read_odoo_groups(model_name, domain, groupby, context=None):
+    """
+    Agregação no servidor (read_group com lazy=False): uma linha por combinação dos campos de
+    'groupby', com a quantidade de registros em '__count'. Retorna a lista de grupos ou None em caso de erro.
+    """
+    def read_groups():
+        with _pool.connection() as odoo, _rpc_span(model_name, 'read_group') as rpc:
+            groups = odoo.env[model_name].read_group(domain, groupby, groupby, lazy=False, context=context or {}) or []
+            rpc['rows'] = len(groups)
+            return groups
+    groups = _run_odoo_read(model_name, read_groups)
+    return None if groups is _READ_FAILED else groups
 
-    try:
-        # print(f"INFO: Buscando dados para o modelo {model_name}...") # Descomente para debug detalhado
-        data = env[model_name].search_read(domain, fields, context=context or {})
-        return data if data else []
-    except odoorpc.error.RPCError as e:
-        print(f"ATENÇÃO: RPCError ao buscar dados de {model_name}: {getattr(e, 'message', str(e))} (Fault Code: {getattr(e, 'faultCode', 'N/A')})")
-        fault_code_str = str(getattr(e, 'faultCode', '')).lower()
-        error_message_str = str(getattr(e, 'message', str(e))).lower()
-        
-        # Condições comuns para erros de sessão/login
-        session_errors = ["session", "login", "authent", "zugriff verweigert", "access denied", "login required"]
-        
-        if any(err_key in fault_code_str for err_key in session_errors) or \
-           any(err_key in error_message_str for err_key in session_errors):
-            print(f"INFO: Erro de sessão detectado para {model_name}. Invalidando instância para forçar novo login na próxima tentativa.")
-            global _odoo_instance
-            _odoo_instance = None # Força _connect_and_login() na próxima chamada a get_odoo_env()
-        return [] 
-    except Exception as e:
-        print(f"ATENÇÃO: Erro genérico ao buscar dados de {model_name}: {type(e).__name__} - {e}")
-        return []
+
+# Leituras independentes da atualização (projetos, tags, tarefas) feitas ao mesmo tempo. Pool separado
+# do de blocos: uma leitura daqui espera pelos blocos dela sem ocupar os workers que os leem
+_fetch_executor = None
+_fetch_executor_lock = threading.Lock()
+
+def _get_fetch_executor():
+    global _fetch_executor
+    with _fetch_executor_lock:
+        if _fetch_executor is None:
+            _fetch_executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix='odoo-fetch')
+    return _fetch_executor
+
+def read_concurrently(reads):
+    """
+    Executa ao mesmo tempo as leituras de 'reads' ({nome: função sem argumentos}); o tempo total
+    é o da mais lenta. Retorna ({nome: resultado}, {nome: quantidade de leituras que falharam}).
+    """
+    def run(read):
+        _thread_failures.count = 0
+        result = read()
+        return result, _thread_failure_count()
+    futures = {name: _get_fetch_executor().submit(run, read) for name, read in reads.items()}
+    results, failures = {}, {}
+    for name, future in futures.items():
+        results[name], failures[name] = future.result()
+    return results, failures
 
 
 def _extract_relational_field(value, part='name'):
@@ -97,22 +475,22 @@ def _extract_relational_field(value, part='name'):
     # Se o campo for False (vazio no Odoo) ou formato inesperado
     return None
 
-def get_projects():
-    """Busca e processa os dados de projetos do Odoo."""
-    project_data = execute_odoo_read(
-        model_name="project.project",
-        domain=[("active", "=", True)],
-        fields=["id", "name", "date_start", "date", "user_id", "task_count", "open_task_count", "tag_ids"]
-    )
-    df_projects = pd.DataFrame(project_data)
+PROJECT_FIELDS = ["id", "name", "date_start", "date", "user_id", "task_count", "open_task_count", "tag_ids"]
+
+def read_projects():
+    """Registros brutos dos projetos ativos (DataFrame vazio em caso de erro)."""
+    return pd.DataFrame(execute_odoo_read(model_name="project.project", domain=[("active", "=", True)], fields=PROJECT_FIELDS))
 
+def read_department_tags():
+    """Nomes das tags de projeto (a primeira tag do projeto é o departamento): {id: nome}."""
+    df_tags = pd.DataFrame(execute_odoo_read(model_name='project.tags', domain=[], fields=['id', 'name']))
+    return dict(zip(df_tags['id'], df_tags['name'])) if not df_tags.empty else {}
+
+def build_projects_frame(df_projects, tag_map):
+    """Processa os projetos lidos por read_projects, com o departamento vindo de tag_map."""
     if not df_projects.empty:
         if "user_id" in df_projects.columns:
             df_projects["user_id"] = df_projects["user_id"].apply(lambda x: _extract_relational_field(x, 'name'))
-        
-        tag_data = execute_odoo_read(model_name='project.tags', domain=[], fields=['id', 'name'])
-        df_tags = pd.DataFrame(tag_data)
-        tag_map = dict(zip(df_tags['id'], df_tags['name'])) if not df_tags.empty else {}
 
         def map_department(tag_ids_list): # tag_ids_list é uma lista de IDs de tags
             if isinstance(tag_ids_list, (list, tuple)) and tag_ids_list:
@@ -137,16 +515,12 @@ def get_projects():
 
     return df_projects
 
-def get_tasks():
-    """Busca e processa os dados de tarefas do Odoo."""
-    tasks_data = execute_odoo_read(
-        model_name="project.task",
-        domain=[("project_id.active", "=", True)], # Busca tarefas de projetos ativos
-        fields=[
-            "id", "name", "create_date", "date_deadline", "date_end", "partner_id",  
-            "project_id", "stage_id", "state", "active", "parent_id", "depend_on_ids"
-        ]
-    )
+def get_projects():
+    """Busca e processa os dados de projetos do Odoo."""
+    return build_projects_frame(read_projects(), read_department_tags())
+
+def _build_tasks_frame(tasks_data):
+    """Converte os registros brutos de project.task (lista ou DataFrame) no DataFrame usado pela dashboard."""
     df_tasks = pd.DataFrame(tasks_data)
 
     if not df_tasks.empty:
@@ -183,14 +557,155 @@ def get_tasks():
         expected_cols = ['id', 'name', 'create_date', 'date_deadline', 'date_end', 'partner_id', 
                          'project_id', 'stage_id', 'state', 'active', 'parent_id', 'depend_on_ids', 
                          'project_id_id', 'project_id_name', 'stage_id_id', 'stage_id_name', 
-                         'depend_on_ids_list']
+                         'depend_on_ids_list', 'write_date']
         for col in expected_cols:
             if col not in df_tasks.columns:
                  df_tasks[col] = None if col != 'depend_on_ids_list' else pd.Series([[] for _ in range(len(df_tasks))], dtype='object')
 
     # Assegurar tipos de dados corretos para colunas de data
-    for col_date in ['create_date', 'date_deadline', 'date_end']:
+    for col_date in ['create_date', 'date_deadline', 'date_end', 'write_date']:
         if col_date in df_tasks.columns:
             df_tasks[col_date] = pd.to_datetime(df_tasks[col_date], errors='coerce')
             
-    return df_tasks
\ No newline at end of file
+    return df_tasks
+
+def get_tasks():
+    """Busca e processa os dados de tarefas do Odoo (carga completa)."""
+    tasks_data = read_odoo_frame(
+        model_name="project.task",
+        domain=TASK_DOMAIN,
+        fields=task_refresh_fields()
+    )
+    return _build_tasks_frame(tasks_data)
+
+
+def get_project_task_details(project_ids):
+    """
+    Detalhe completo (TASK_FIELDS) das tarefas dos projetos pedidos, em uma única leitura.
+    Retorna None em caso de falha (para diferenciar de 'projetos sem tarefas').
+    """
+    failures_before = _thread_failure_count()
+    domain = TASK_DOMAIN + [("project_id", "in", [int(pid) for pid in project_ids])]
+    tasks_data = read_odoo_frame("project.task", domain, TASK_FIELDS)
+    if _thread_failure_count() > failures_before:
+        return None
+    return _build_tasks_frame(tasks_data)
+
+
+TASK_STATUS_GROUPBY = ["project_id", "stage_id", "state"]
+
+def get_task_status_groups(hoje):
+    """
+    Quantidade de tarefas por projeto, estágio, state e prazo vencido (antes de 'hoje'), agregada
+    no Odoo: algumas centenas de linhas em vez de uma por tarefa. São as entradas das regras de
+    status (task_status.classify_tasks). DataFrame com 'project_id_id', 'stage_id_name', 'state',
+    'overdue' e 'count'; None em caso de falha.
+    """
+    cutoff = hoje.strftime('%Y-%m-%d') # O Odoo completa com 00:00:00 em campos datetime
+    frames = []
+    for overdue, deadline_domain in ((True, [("date_deadline", "<", cutoff)]),
+                                     (False, ['|', ("date_deadline", "=", False), ("date_deadline", ">=", cutoff)])):
+        groups = read_odoo_groups("project.task", TASK_DOMAIN + deadline_domain, TASK_STATUS_GROUPBY)
+        if groups is None:
+            return None
+        frames.append(pd.DataFrame({
+            'project_id_id': [_extract_relational_field(g.get('project_id'), 'id') for g in groups],
+            'stage_id_name': [_extract_relational_field(g.get('stage_id'), 'name') for g in groups],
+            'state': [g.get('state') or None for g in groups],
+            'overdue': [overdue] * len(groups),
+            'count': [g.get('__count', 0) for g in groups],
+        }))
+    return pd.concat(frames, ignore_index=True)
+
+
+def _max_write_date(df_tasks):
+    """Retorna o maior write_date do DataFrame no formato aceito pelo domínio do Odoo (ou None)."""
+    if df_tasks.empty or 'write_date' not in df_tasks.columns or df_tasks['write_date'].isna().all():
+        return None
+    return df_tasks['write_date'].max().strftime('%Y-%m-%d %H:%M:%S')
+
+
+def _record_task_sync(changed_ids, removed_ids, advance=True):
+    """
+    Registra o resultado da sincronização (chamar com _task_sync_lock adquirido).
+    changed_ids/removed_ids None indica carga completa; advance=False indica que a tabela não mudou.
+    """
+    base_seq = _task_sync_state['seq']
+    if advance:
+        _task_sync_state['seq'] += 1
+    _task_sync_state['last_sync'] = {
+        'seq': _task_sync_state['seq'],
+        'base_seq': base_seq if changed_ids is not None else None, # Tabela sobre a qual o delta foi aplicado
+        'changed_ids': changed_ids,
+        'removed_ids': removed_ids,
+    }
+
+def last_task_sync():
+    """
+    Resultado da última chamada de sync_tasks: {'seq', 'base_seq', 'changed_ids', 'removed_ids'}.
+    Numa sincronização incremental, a tabela 'seq' é a tabela 'base_seq' sem as tarefas removidas e
+    com as alteradas/novas substituídas; numa carga completa base_seq e as listas são None.
+    """
+    with _task_sync_lock:
+        return _task_sync_state['last_sync']
+
+def sync_tasks(full=False):
+    """
+    Retorna a tabela de tarefas atualizada, de forma incremental sempre que possível.
+
+    Na primeira chamada (ou com full=True / TASK_SYNC_MODE=full) faz a carga completa.
+    Nas seguintes busca apenas as tarefas com write_date >= última marca d'água e faz
+    uma passada leve só de IDs para detectar tarefas excluídas, arquivadas ou que passaram
+    a ser visíveis (ex.: projeto reativado). O resultado é mesclado na tabela em memória.
+    Observação: mudanças que não alteram o write_date da tarefa (ex.: renomear um estágio)
+    só aparecem na próxima carga completa.
+    """
+    with _task_sync_lock:
+        current_df = _task_sync_state['df']
+        watermark = _task_sync_state['watermark']
+
+        if full or TASK_SYNC_MODE == 'full' or current_df is None or current_df.empty or watermark is None:
+            failures_before = _thread_failure_count()
+            df_tasks = get_tasks()
+            if _thread_failure_count() > failures_before: # Falha na leitura: não descarta a última tabela conhecida
+                _record_task_sync(changed_ids=[], removed_ids=[], advance=False)
+                return current_df.copy() if current_df is not None else df_tasks
+            _task_sync_state['df'] = df_tasks
+            _task_sync_state['watermark'] = _max_write_date(df_tasks)
+            _record_task_sync(changed_ids=None, removed_ids=None)
+            print(f"INFO: Carga completa de tarefas: {len(df_tasks)} registros.")
+            return df_tasks.copy()
+
+        alive_ids = execute_odoo_search("project.task", TASK_DOMAIN)
+        if alive_ids is None: # Falha no Odoo: mantém a última tabela conhecida
+            _record_task_sync(changed_ids=[], removed_ids=[], advance=False)
+            return current_df.copy()
+
+        new_ids = list(set(alive_ids) - set(current_df['id']))
+        delta_domain = TASK_DOMAIN + ['|', ("write_date", ">=", watermark), ("id", "in", new_ids)]
+        df_changed = _build_tasks_frame(read_odoo_frame("project.task", delta_domain, task_refresh_fields()))
+
+        # Remove as tarefas que sumiram do Odoo e as versões antigas das alteradas
+        keep_mask = current_df['id'].isin(alive_ids)
+        if not df_changed.empty:
+            keep_mask &= ~current_df['id'].isin(df_changed['id'])
+        removed_ids = current_df.loc[~current_df['id'].isin(alive_ids), 'id'].tolist()
+        removed_count = len(removed_ids)
+        df_tasks = current_df[keep_mask]
+        if not df_changed.empty:
+            df_tasks = pd.concat([df_tasks, df_changed], ignore_index=True)
+        # Mantém a mesma ordem de uma carga completa (ordem padrão retornada pelo Odoo)
+        order_pos = {task_id: pos for pos, task_id in enumerate(alive_ids)}
+        df_tasks = df_tasks.sort_values('id', key=lambda ids: ids.map(order_pos), kind='stable').reset_index(drop=True)
+        # O concat com o lote alterado (pequeno) muda tipos (datas em ns, texto em object): volta ao
+        # esquema da tabela carregada para que o fingerprint de uma atualização sem mudanças não mude
+        df_tasks = df_tasks.astype({col: dtype for col, dtype in current_df.dtypes.items() if col in df_tasks.columns})
+
+        _task_sync_state['df'] = df_tasks
+        new_watermark = _max_write_date(df_changed)
+        if new_watermark and new_watermark > watermark:
+            _task_sync_state['watermark'] = new_watermark
+        _record_task_sync(changed_ids=df_changed['id'].tolist() if not df_changed.empty else [], removed_ids=removed_ids)
+        if not df_changed.empty or removed_count:
+            print(f"INFO: Sincronização incremental de tarefas: {len(df_changed)} recebidas (alteradas/novas), {removed_count} removidas.")
+        return df_tasks.copy()
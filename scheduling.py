@@ -0,0 +1,169 @@
+import numpy as np
+import pandas as pd
+
+# Cálculo de cronograma (início calculado, início mais tarde e folga) a partir das dependências
+# entre tarefas ('depend_on_ids_list'). Substitui o antigo recalc()/find_start() recursivo:
+# o grafo é percorrido uma única vez, em ordem de dependência, usando listas e dicionários simples.
+
+DAY_NS = 86400 * 10**9
+_NAT_NS = np.iinfo(np.int64).min
+
+
+def _to_ns_list(series):
+    """Converte uma Series de datas em lista de inteiros (ns) com None no lugar de NaT."""
+    values = pd.to_datetime(series, errors='coerce').astype('datetime64[ns]').to_numpy().view('int64')
+    return [None if v == _NAT_NS else int(v) for v in values]
+
+
+def _from_ns_list(values, index):
+    arr = np.array([_NAT_NS if v is None else v for v in values], dtype='int64').view('datetime64[ns]')
+    return pd.Series(arr, index=index)
+
+
+def _strongly_connected_components(n, deps):
+    """
+    Tarjan iterativo. deps[i] lista os nós dos quais i depende.
+    Retorna (componentes, comp_of): os componentes saem em ordem de dependência
+    (um componente só aparece depois de todos dos quais ele depende).
+    """
+    index_of = [-1] * n
+    lowlink = [0] * n
+    on_stack = [False] * n
+    comp_of = [-1] * n
+    stack, components = [], []
+    counter = 0
+    for root in range(n):
+        if index_of[root] != -1:
+            continue
+        work = [(root, 0)]
+        while work:
+            node, edge_pos = work[-1]
+            if edge_pos == 0:
+                index_of[node] = lowlink[node] = counter
+                counter += 1
+                stack.append(node)
+                on_stack[node] = True
+            node_deps = deps[node]
+            if edge_pos < len(node_deps):
+                work[-1] = (node, edge_pos + 1)
+                nxt = node_deps[edge_pos]
+                if index_of[nxt] == -1:
+                    work.append((nxt, 0))
+                elif on_stack[nxt]:
+                    lowlink[node] = min(lowlink[node], index_of[nxt])
+                continue
+            work.pop()
+            if work:
+                parent = work[-1][0]
+                lowlink[parent] = min(lowlink[parent], lowlink[node])
+            if lowlink[node] == index_of[node]:
+                component = []
+                while True:
+                    member = stack.pop()
+                    on_stack[member] = False
+                    comp_of[member] = len(components)
+                    component.append(member)
+                    if member == node:
+                        break
+                components.append(component)
+    return components, comp_of
+
+
+def compute_schedule(df_tasks):
+    """
+    Calcula o cronograma de todas as tarefas em O(V+E).
+
+    Regras (as mesmas do antigo find_start):
+    - sem dependências: início = create_date;
+    - com dependências: início = 1 dia após o maior prazo entre as dependências; uma dependência
+      sem prazo usa o próprio início calculado + duração (duration_expected_days, mínimo 1 dia).
+
+    Retorna (schedule, cycles):
+    - schedule: DataFrame com o mesmo índice de df_tasks e as colunas 'calculated_start',
+      'early_start', 'late_start', 'slack_days' e 'in_dependency_cycle';
+    - cycles: lista de ciclos de dependência encontrados (listas de IDs de tarefas). Dentro de
+      um ciclo, as dependências sem prazo são ignoradas para que o cálculo termine.
+    """
+    columns = ['calculated_start', 'early_start', 'late_start', 'slack_days', 'in_dependency_cycle']
+    if df_tasks.empty or 'id' not in df_tasks.columns:
+        schedule = pd.DataFrame(index=df_tasks.index, columns=columns)
+        for col in ['calculated_start', 'early_start', 'late_start']:
+            schedule[col] = pd.Series(pd.NaT, index=df_tasks.index, dtype='datetime64[ns]')
+        schedule['slack_days'] = np.nan
+        schedule['in_dependency_cycle'] = False
+        return schedule, []
+
+    n = len(df_tasks)
+    ids = df_tasks['id'].tolist()
+    pos_of = {}
+    for pos, task_id in enumerate(ids):
+        pos_of.setdefault(task_id, pos)
+
+    create_ns = _to_ns_list(df_tasks['create_date']) if 'create_date' in df_tasks.columns else [None] * n
+    deadline_ns = _to_ns_list(df_tasks['date_deadline']) if 'date_deadline' in df_tasks.columns else [None] * n
+
+    # Duração usada para dependências sem prazo (regra herdada: a da tarefa dependente, mínimo 1 dia)
+    duration_ns = [DAY_NS] * n
+    if 'duration_expected_days' in df_tasks.columns:
+        for pos, days in enumerate(df_tasks['duration_expected_days'].tolist()):
+            if isinstance(days, (int, float)) and not isinstance(days, bool) and days > 0:
+                duration_ns[pos] = int(days * DAY_NS)
+
+    raw_deps = df_tasks['depend_on_ids_list'].tolist() if 'depend_on_ids_list' in df_tasks.columns else [[]] * n
+    deps = [[pos_of[d] for d in dep_list if d in pos_of] if isinstance(dep_list, list) else [] for dep_list in raw_deps]
+
+    components, comp_of = _strongly_connected_components(n, deps)
+    cycles = [sorted(ids[p] for p in comp) for comp in components
+              if len(comp) > 1 or comp[0] in deps[comp[0]]]
+    in_cycle = [False] * n
+    for comp in components:
+        if len(comp) > 1 or comp[0] in deps[comp[0]]:
+            for p in comp:
+                in_cycle[p] = True
+
+    # Passo de ida: início mais cedo (= início calculado), em ordem de dependência
+    early = [None] * n
+    for comp in components:
+        for i in comp:
+            latest = None
+            for j in deps[i]:
+                dep_end = deadline_ns[j]
+                if dep_end is None:
+                    if comp_of[j] == comp_of[i]: # Dependência circular sem prazo: ignorada
+                        continue
+                    if early[j] is not None:
+                        dep_end = early[j] + duration_ns[i]
+                if dep_end is not None and (latest is None or dep_end > latest):
+                    latest = dep_end
+            early[i] = latest + DAY_NS if latest is not None else create_ns[i]
+
+    # Término de cada tarefa: prazo, ou início + 1 dia quando não há prazo
+    finish = [deadline_ns[i] if deadline_ns[i] is not None else (early[i] + DAY_NS if early[i] is not None else None)
+              for i in range(n)]
+    successors = [[] for _ in range(n)]
+    for i in range(n):
+        for j in deps[i]:
+            if comp_of[j] != comp_of[i]:
+                successors[j].append(i)
+
+    # Passo de volta: início mais tarde sem atrasar as tarefas que dependem desta
+    late = [None] * n
+    for comp in reversed(components):
+        for i in comp:
+            if early[i] is None or finish[i] is None:
+                continue
+            late_finish = None
+            for s in successors[i]:
+                if late[s] is not None and (late_finish is None or late[s] - DAY_NS < late_finish):
+                    late_finish = late[s] - DAY_NS
+            if late_finish is None:
+                late_finish = finish[i]
+            late[i] = late_finish - (finish[i] - early[i])
+
+    schedule = pd.DataFrame(index=df_tasks.index)
+    schedule['calculated_start'] = _from_ns_list(early, df_tasks.index)
+    schedule['early_start'] = schedule['calculated_start']
+    schedule['late_start'] = _from_ns_list(late, df_tasks.index)
+    schedule['slack_days'] = (schedule['late_start'] - schedule['early_start']) / pd.Timedelta(days=1)
+    schedule['in_dependency_cycle'] = in_cycle
+    return schedule, cycles
@@ -0,0 +1,260 @@
+import threading
+import time
+import random
+import hashlib
+from collections import OrderedDict
+import numpy as np
+import pandas as pd
+import compact_snapshot
+import metrics
+
+
+class Snapshot:
+    """
+    Foto imutável dos dados preparados (projetos e tarefas) em um dado momento.
+    'version' cresce a cada publicação com conteúdo diferente do anterior.
+    'load_info' traz os metadados da carga (ex.: dia de referência, resultado da sincronização de
+    tarefas) e 'derived' as tabelas derivadas calculadas uma vez por snapshot (ver add_derived).
+    As tarefas ficam no esquema compacto de compact_snapshot; dependências e implicações ficam em
+    'dependencies'/'implications' (CSR por posição em tasks) e os nomes só são montados ao exibir.
+    """
+    def __init__(self, version, projects, tasks, fingerprint, load_info=None, dependencies=None, implications=None):
+        if dependencies is None or implications is None:
+            stages = metrics.StageTimer('dashboard_prepare_stage')
+            tasks, dependencies, implications = compact_snapshot.compact_tasks(tasks)
+            stages.mark('compact_and_implications')
+        self.version = version
+        self.projects = projects
+        self.tasks = tasks
+        self.dependencies = dependencies
+        self.implications = implications
+        self.fingerprint = fingerprint
+        self.load_info = load_info or {}
+        self.derived = {}
+        self.created_at = time.time()  # Momento da última confirmação do conteúdo junto ao Odoo
+        # Índices de grupo construídos uma vez por snapshot: consultas viram fatias O(k)
+        self.tasks_by_project = _group_positions(tasks, 'project_id_id')       # project_id -> posições em tasks
+        self.projects_by_department = _group_positions(projects, 'department') # departamento -> posições em projects
+        # Para montar nomes de dependências/implicações na hora de exibir
+        self._task_ids = pd.Index(tasks['id']) if 'id' in tasks.columns else pd.Index([])
+        self._task_names = tasks['name'].to_numpy(dtype=object) if 'name' in tasks.columns else np.array([], dtype=object)
+
+    def tasks_for_project(self, project_id):
+        """Tarefas de um projeto, sem varrer a tabela inteira."""
+        return self.tasks.iloc[self.tasks_by_project.get(project_id, _EMPTY_POSITIONS)]
+
+    def task_positions_for_projects(self, project_ids):
+        """Posições (iloc) das tarefas de vários projetos, em ordem crescente."""
+        positions = [self.tasks_by_project[pid] for pid in project_ids if pid in self.tasks_by_project]
+        return np.sort(np.concatenate(positions)) if positions else _EMPTY_POSITIONS
+
+    def tasks_for_projects(self, project_ids):
+        """Tarefas de vários projetos, na mesma ordem em que aparecem na tabela completa."""
+        return self.tasks.iloc[self.task_positions_for_projects(project_ids)]
+
+    def dependency_ids(self, positions):
+        """Listas de IDs das dependências das tarefas nas posições pedidas."""
+        return self.dependencies.lists_for(positions)
+
+    def implication_ids(self, positions):
+        """Listas de IDs das tarefas que dependem das tarefas nas posições pedidas."""
+        return self.implications.lists_for(positions)
+
+    def implications_of(self, task_id):
+        """IDs das tarefas que dependem da tarefa 'task_id' (lista vazia se ela não existir)."""
+        position = compact_snapshot.positions_of(self._task_ids, [task_id])[0]
+        return self.implications.ids_of(position) if position >= 0 else []
+
+    def dependency_names(self, positions):
+        """Nomes das dependências das tarefas nas posições pedidas ('ID:<id>' se a tarefa não foi carregada)."""
+        return compact_snapshot.resolve_names(self.dependencies, positions, self._task_ids, self._task_names)
+
+    def implication_names(self, positions):
+        """Nomes das tarefas que dependem das tarefas nas posições pedidas."""
+        return compact_snapshot.resolve_names(self.implications, positions, self._task_ids, self._task_names)
+
+    def projects_in_department(self, department):
+        """Projetos de um departamento."""
+        return self.projects.iloc[self.projects_by_department.get(department, _EMPTY_POSITIONS)]
+
+
+_EMPTY_POSITIONS = np.array([], dtype=np.intp)
+
+def _group_positions(df, column):
+    """Mapeia cada valor de 'column' para o array de posições (iloc) das linhas correspondentes."""
+    if df is None or df.empty or column not in df.columns:
+        return {}
+    return df.groupby(column, sort=False).indices
+
+
+def _frame_fingerprint(df):
+    """Gera um hash do conteúdo do DataFrame (colunas com listas são convertidas para texto)."""
+    if df is None or df.empty:
+        return hashlib.sha1(repr(list(df.columns) if df is not None else []).encode()).hexdigest()
+    hashable = df.copy()
+    for col in hashable.columns:
+        if hashable[col].dtype == object:
+            hashable[col] = hashable[col].astype(str)
+    row_hashes = pd.util.hash_pandas_object(hashable, index=False).values
+    return hashlib.sha1(row_hashes.tobytes() + repr(list(df.columns)).encode()).hexdigest()
+
+
+class SnapshotCache:
+    """
+    Cache de snapshots compartilhado por todo o processo.
+    Todas as callbacks consultam a mesma instância. O 'loader' é executado pela atualização em
+    segundo plano (get(force=True)); chamadas concorrentes de get() compartilham uma única
+    execução (single-flight) e reutilizam o resultado.
+    Os navegadores guardam só a versão; resolve() a converte nos DataFrames do servidor.
+    """
+    def __init__(self, loader, keep_versions=3):
+        self._loader = loader  # Função que retorna (df_projects, df_tasks, load_info) já preparados
+        self._refresh_lock = threading.Lock()
+        self._snapshot = None
+        self._keep_versions = keep_versions
+        self._recent = OrderedDict() # Últimas versões publicadas, para clientes que ainda não atualizaram
+        self._refresh_thread = None
+        self._listeners = [] # Chamados com o novo snapshot a cada publicação (ex.: invalidar caches de figuras)
+        self._derived = [] # (nome, builder) das tabelas derivadas, calculadas antes de publicar
+        self._refresh_listeners = [] # Chamados após cada tentativa da atualização em segundo plano
+        self.last_error = None # Última falha da atualização em segundo plano (None se a última deu certo)
+
+    def peek(self):
+        """Retorna o snapshot atual sem nunca disparar uma atualização (pode ser None)."""
+        return self._snapshot
+
+    def add_listener(self, callback):
+        """Registra callback(snapshot), chamado sempre que uma nova versão é publicada."""
+        self._listeners.append(callback)
+
+    def add_refresh_listener(self, callback):
+        """
+        Registra callback(cache), chamado após cada tentativa da atualização em segundo plano
+        (com ou sem sucesso, com ou sem versão nova).
+        """
+        self._refresh_listeners.append(callback)
+
+    def add_derived(self, name, builder):
+        """
+        Registra builder(snapshot, anterior), chamado uma vez por snapshot antes de publicá-lo; o
+        resultado fica em snapshot.derived[name]. 'anterior' é o snapshot publicado até então (ou
+        None), para permitir atualizações incrementais.
+        """
+        self._derived.append((name, builder))
+
+    def resolve(self, version):
+        """
+        Retorna o snapshot da versão pedida se ainda estiver retido; senão o atual.
+        Nunca dispara uma atualização (pode retornar None antes da primeira carga).
+        """
+        snapshot = self._recent.get(version) if version is not None else None
+        return snapshot if snapshot is not None else self._snapshot
+
+    def get(self, force=False):
+        """
+        Retorna o snapshot atual, carregando-o se ainda não houver nenhum (ou sempre, com force=True).
+        Chamadas concorrentes compartilham uma única atualização.
+        """
+        snapshot = self._snapshot
+        if not force and snapshot is not None:
+            return snapshot
+
+        requested_at = time.time()
+        with self._refresh_lock:
+            snapshot = self._snapshot
+            # Outra thread pode ter atualizado enquanto aguardávamos o lock
+            if snapshot is not None and snapshot.created_at >= requested_at:
+                return snapshot
+            if not force and snapshot is not None:
+                return snapshot
+            return self._refresh()
+
+    def _refresh(self):
+        df_projects, df_tasks, load_info = self._loader()
+        fingerprint = _frame_fingerprint(df_projects) + _frame_fingerprint(df_tasks)
+        current = self._snapshot
+        if current is not None and current.fingerprint == fingerprint:
+            # Conteúdo idêntico: mantém a versão para que os clientes não recalculem as telas à toa
+            current.created_at = time.time()
+            current.load_info = load_info or {} # As tabelas derivadas continuam valendo para o mesmo conteúdo
+            return current
+        # Versão baseada no relógio: continua crescendo mesmo após reinícios do processo
+        version = int(time.time() * 1000)
+        if current is not None and version <= current.version:
+            version = current.version + 1
+        return self._publish(Snapshot(version, df_projects, df_tasks, fingerprint, load_info), current)
+
+    def _publish(self, snapshot, previous):
+        """Calcula as tabelas derivadas, torna o snapshot atual e avisa os listeners."""
+        for name, builder in self._derived:
+            try:
+                with metrics.span('dashboard_derived_build', derived=name):
+                    snapshot.derived[name] = builder(snapshot, previous)
+            except Exception as e:
+                # Sem a tabela derivada, quem a consulta recalcula por conta própria
+                print(f"ATENÇÃO: Erro ao calcular '{name}' do snapshot: {type(e).__name__} - {e}")
+        self._snapshot = snapshot
+        self._recent[snapshot.version] = snapshot
+        while len(self._recent) > self._keep_versions:
+            self._recent.popitem(last=False)
+        print(f"INFO: Novo snapshot de dados publicado (versão {snapshot.version}, {len(snapshot.projects)} projetos, {len(snapshot.tasks)} tarefas).")
+        for listener in self._listeners:
+            try:
+                listener(snapshot)
+            except Exception as e:
+                print(f"ATENÇÃO: Erro em listener de publicação de snapshot: {type(e).__name__} - {e}")
+        return snapshot
+
+    def restore(self, df_projects, df_tasks, version, fingerprint, created_at, load_info=None, dependencies=None, implications=None):
+        """
+        Publica um snapshot salvo anteriormente (ex.: lido do disco) se ainda não houver nenhum ou
+        se for de uma versão mais nova que a atual (ex.: gravado por outro processo).
+        'created_at' original é mantido, então a idade exibida é a real. Retorna o snapshot ou None.
+        """
+        with self._refresh_lock:
+            current = self._snapshot
+            if current is not None and version <= current.version:
+                return None
+            snapshot = Snapshot(version, df_projects, df_tasks, fingerprint, load_info, dependencies, implications)
+            snapshot.created_at = created_at
+            return self._publish(snapshot, current)
+
+    def start_background_refresh(self, interval_seconds, jitter_seconds=10, max_backoff_seconds=900):
+        """
+        Inicia (uma única vez) a thread que atualiza o snapshot no próprio ritmo, independente
+        dos navegadores. A primeira carga é imediata. Se o Odoo falhar, o intervalo dobra a cada
+        erro (até max_backoff_seconds); se estiver lento, o intervalo cresce com a duração da carga.
+        O snapshot publicado continua sendo servido enquanto isso.
+        """
+        if self._refresh_thread is not None:
+            return
+        self._refresh_thread = threading.Thread(
+            target=self._refresh_loop, args=(interval_seconds, jitter_seconds, max_backoff_seconds),
+            name='snapshot-refresh', daemon=True)
+        self._refresh_thread.start()
+
+    def _refresh_loop(self, interval_seconds, jitter_seconds, max_backoff_seconds):
+        failures = 0
+        delay = 0
+        while True:
+            time.sleep(delay)
+            started = time.monotonic()
+            try:
+                with metrics.span('dashboard_refresh'):
+                    self.get(force=True)
+                failures = 0
+                self.last_error = None
+                duration = time.monotonic() - started
+                # Odoo lento: espera pelo menos o dobro do tempo que a carga levou
+                delay = max(interval_seconds, 2 * duration)
+            except Exception as e:
+                failures += 1
+                self.last_error = f"{type(e).__name__}: {e}"
+                delay = min(interval_seconds * (2 ** (failures - 1)), max_backoff_seconds)
+                print(f"ATENÇÃO: Falha ao atualizar os dados ({self.last_error}). Nova tentativa em {delay:.0f}s; mantendo o último snapshot.")
+            for listener in self._refresh_listeners:
+                try:
+                    listener(self)
+                except Exception as e:
+                    print(f"ATENÇÃO: Erro em listener de atualização: {type(e).__name__} - {e}")
+            delay += random.uniform(0, jitter_seconds) # Evita que vários processos consultem o Odoo ao mesmo tempo
@@ -0,0 +1,255 @@
+import os
+import json
+import time
+import threading
+import pandas as pd
+import compact_snapshot
+
+# Cópia em disco do último snapshot publicado (formato Arrow IPC, colunar e sem compressão, lido
+# com memory-map). Permite que o container volte a exibir dados logo após reiniciar, mesmo com
+# o Odoo fora do ar, enquanto a atualização em segundo plano busca dados novos.
+# pyarrow é opcional: sem ele a persistência fica desativada.
+try:
+    import pyarrow as pa
+except ImportError:
+    pa = None
+# Com vários processos (ex.: workers do gunicorn), só o que segura o lock consulta o Odoo; os
+# demais leem o snapshot que ele grava aqui. fcntl não existe no Windows: lá cada processo busca sozinho.
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+SNAPSHOT_DIR = os.getenv("SNAPSHOT_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), "snapshot_data"))
+_FILES = {'projects': 'projects.arrow', 'tasks': 'tasks.arrow'}
+_META_KEY = b'dashboard_snapshot'
+_STATUS_FILE = 'status.json' # Versão/horário da última confirmação junto ao Odoo e último erro do processo líder
+_LEADER_LOCK_FILE = 'leader.lock'
+SHARED_POLL_SECONDS = float(os.getenv("SNAPSHOT_POLL_SECONDS", 5)) # Frequência com que os demais processos verificam o disco
+_EDGE_COLUMNS = {'dependencies': 'depend_on_ids_list', 'implications': 'implications_ids'} # Arestas CSR gravadas como listas Arrow
+
+
+def is_enabled():
+    return pa is not None and bool(SNAPSHOT_DIR)
+
+
+def _arrow_table(df, name):
+    """
+    Converte o DataFrame para Arrow. Colunas que o Arrow não representa (ex.: campos relacionais
+    crus do Odoo, como [id, 'nome'] ou False) são descartadas: o dashboard usa as versões já
+    extraídas (project_id_id, stage_id_name...).
+    """
+    try:
+        return pa.Table.from_pandas(df, preserve_index=False)
+    except (pa.ArrowInvalid, pa.ArrowTypeError, TypeError, ValueError):
+        pass
+    dropped = []
+    for col in df.columns:
+        try:
+            pa.Table.from_pandas(df[[col]], preserve_index=False)
+        except (pa.ArrowInvalid, pa.ArrowTypeError, TypeError, ValueError):
+            dropped.append(col)
+    print(f"INFO: Colunas não persistidas em {name}: {dropped}")
+    return pa.Table.from_pandas(df.drop(columns=dropped), preserve_index=False)
+
+
+def _write_table(table, path, meta):
+    table = table.replace_schema_metadata({**(table.schema.metadata or {}), _META_KEY: json.dumps(meta).encode()})
+    tmp_path = path + '.tmp'
+    with pa.OSFile(tmp_path, 'wb') as sink:
+        with pa.ipc.new_file(sink, table.schema) as writer:
+            writer.write_table(table)
+    os.replace(tmp_path, path) # Troca atômica: quem lê nunca vê um arquivo pela metade
+
+
+def save(snapshot):
+    """Grava o snapshot em SNAPSHOT_DIR (usado como listener de publicação do SnapshotCache)."""
+    load_info = snapshot.load_info or {}
+    if not is_enabled() or load_info.get('from_disk') or load_info.get('shared'):
+        return
+    started = time.monotonic()
+    day = load_info.get('day')
+    meta = {
+        'version': snapshot.version,
+        'fingerprint': snapshot.fingerprint,
+        'created_at': snapshot.created_at,
+        'day': day.isoformat() if day is not None else None,
+    }
+    try:
+        os.makedirs(SNAPSHOT_DIR, exist_ok=True)
+        _write_table(_arrow_table(snapshot.projects, 'projects'), os.path.join(SNAPSHOT_DIR, _FILES['projects']), meta)
+        tasks_table = _arrow_table(snapshot.tasks, 'tasks')
+        for attr, col in _EDGE_COLUMNS.items():
+            edges = getattr(snapshot, attr)
+            # offsets/values do CSR viram direto uma coluna de listas, sem passar por objetos Python
+            tasks_table = tasks_table.append_column(col, pa.ListArray.from_arrays(pa.array(edges.offsets, pa.int32()), pa.array(edges.values)))
+        _write_table(tasks_table, os.path.join(SNAPSHOT_DIR, _FILES['tasks']), meta)
+    except Exception as e:
+        print(f"ATENÇÃO: Não foi possível gravar o snapshot em disco ({SNAPSHOT_DIR}): {type(e).__name__} - {e}")
+        return
+    print(f"INFO: Snapshot {snapshot.version} gravado em disco em {time.monotonic() - started:.2f}s.")
+
+
+def _read_table(path):
+    """
+    Lê um arquivo Arrow IPC via memory-map; retorna (DataFrame, arestas, metadados). As colunas
+    de listas de IDs voltam como compact_snapshot.TaskEdges em 'arestas' ({nome do atributo: arestas}).
+    """
+    with pa.memory_map(path, 'r') as source:
+        table = pa.ipc.open_file(source).read_all()
+    meta = json.loads((table.schema.metadata or {}).get(_META_KEY, b'{}'))
+    edges = {}
+    for attr, col in _EDGE_COLUMNS.items():
+        if col in table.column_names:
+            lists = table.column(col).combine_chunks()
+            offsets = lists.offsets.to_numpy()
+            edges[attr] = compact_snapshot.TaskEdges(offsets - offsets[0], lists.flatten().to_numpy(zero_copy_only=False))
+            table = table.drop_columns([col])
+    return table.to_pandas(), edges, meta
+
+
+def load():
+    """
+    Lê o último snapshot gravado. Retorna (df_projects, df_tasks, arestas, meta) ou None se não houver
+    arquivo válido (ou se os dois arquivos forem de versões diferentes).
+    """
+    if not is_enabled():
+        return None
+    paths = {key: os.path.join(SNAPSHOT_DIR, name) for key, name in _FILES.items()}
+    if not all(os.path.exists(p) for p in paths.values()):
+        return None
+    try:
+        df_projects, _, meta_projects = _read_table(paths['projects'])
+        df_tasks, edges, meta_tasks = _read_table(paths['tasks'])
+    except Exception as e:
+        print(f"ATENÇÃO: Snapshot em disco ilegível ({SNAPSHOT_DIR}): {type(e).__name__} - {e}")
+        return None
+    if meta_projects.get('version') != meta_tasks.get('version'):
+        print("ATENÇÃO: Arquivos de snapshot em disco de versões diferentes; ignorando.")
+        return None
+    if meta_tasks.get('day'):
+        meta_tasks['day'] = pd.Timestamp(meta_tasks['day'])
+    if set(edges) != set(_EDGE_COLUMNS):
+        print("ATENÇÃO: Snapshot em disco sem as colunas de dependências (formato antigo); ignorando.")
+        return None
+    return df_projects, df_tasks, edges, meta_tasks
+
+
+def _restore_stored(snapshot_cache, load_info):
+    """Publica no cache o snapshot gravado em disco, se for mais novo. Retorna (snapshot ou None, meta)."""
+    stored = load()
+    if stored is None:
+        return None, None
+    df_projects, df_tasks, edges, meta = stored
+    snapshot = snapshot_cache.restore(df_projects, df_tasks, meta['version'], meta['fingerprint'], meta['created_at'],
+                                      {'day': meta.get('day'), 'task_sync': None, **load_info},
+                                      edges['dependencies'], edges['implications'])
+    return snapshot, meta
+
+
+def warm_start(snapshot_cache):
+    """Publica no cache o snapshot gravado em disco, se houver. Retorna True se publicou."""
+    started = time.monotonic()
+    snapshot, meta = _restore_stored(snapshot_cache, {'from_disk': True})
+    if snapshot is None:
+        return False
+    age_minutes = (time.time() - meta['created_at']) / 60
+    print(f"INFO: Snapshot {meta['version']} carregado do disco em {time.monotonic() - started:.2f}s "
+          f"({len(snapshot.projects)} projetos, {len(snapshot.tasks)} tarefas, de {age_minutes:.0f} min atrás).")
+    return True
+
+
+def write_status(snapshot_cache):
+    """
+    Grava versão, horário da última confirmação junto ao Odoo e último erro do processo líder
+    (listener de atualização do SnapshotCache). Os outros processos usam para exibir a idade real.
+    """
+    snapshot = snapshot_cache.peek()
+    if not is_enabled() or snapshot is None:
+        return
+    status = {'version': snapshot.version, 'created_at': snapshot.created_at, 'last_error': snapshot_cache.last_error}
+    path = os.path.join(SNAPSHOT_DIR, _STATUS_FILE)
+    try:
+        os.makedirs(SNAPSHOT_DIR, exist_ok=True)
+        with open(path + '.tmp', 'w') as f:
+            json.dump(status, f)
+        os.replace(path + '.tmp', path)
+    except OSError as e:
+        print(f"ATENÇÃO: Não foi possível gravar o estado do snapshot ({path}): {e}")
+
+
+def _read_status():
+    try:
+        with open(os.path.join(SNAPSHOT_DIR, _STATUS_FILE)) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+_leader_lock = None # Arquivo do lock mantido aberto enquanto o processo for o líder
+_leader_started = False
+
+def is_leader():
+    """True se este processo é o que consulta o Odoo."""
+    return _leader_started
+
+def _try_become_leader():
+    """Tenta pegar o lock de líder (sem esperar). O sistema o libera sozinho se o processo morrer."""
+    global _leader_lock
+    os.makedirs(SNAPSHOT_DIR, exist_ok=True)
+    lock_file = open(os.path.join(SNAPSHOT_DIR, _LEADER_LOCK_FILE), 'a')
+    try:
+        fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except OSError:
+        lock_file.close()
+        return False
+    _leader_lock = lock_file
+    return True
+
+
+def follow_once(snapshot_cache):
+    """Processo seguidor: adota a versão mais nova gravada pelo líder e a idade/erro informados por ele."""
+    status = _read_status()
+    if status is None:
+        return
+    current = snapshot_cache.peek()
+    if current is None or status['version'] > current.version:
+        _restore_stored(snapshot_cache, {'shared': True})
+        current = snapshot_cache.peek()
+    if current is not None and current.version == status['version']:
+        current.created_at = max(current.created_at, status['created_at'])
+    snapshot_cache.last_error = status.get('last_error')
+
+
+def start_shared_refresh(snapshot_cache, start_leader):
+    """
+    Divide a atualização entre os processos que usam o mesmo SNAPSHOT_DIR: o primeiro a pegar o
+    lock vira líder e executa start_leader() (que inicia as consultas ao Odoo); os outros seguem o
+    snapshot gravado por ele e tentam assumir a liderança se ele parar. Sem persistência em disco
+    ou sem fcntl, cada processo é o próprio líder.
+    """
+    def lead():
+        global _leader_started
+        if is_enabled():
+            snapshot_cache.add_refresh_listener(write_status)
+        _leader_started = True
+        start_leader()
+
+    if not is_enabled() or fcntl is None or _try_become_leader():
+        lead()
+        return
+
+    def follow_loop():
+        print(f"INFO: Outro processo atualiza os dados do Odoo; seguindo o snapshot em {SNAPSHOT_DIR}.")
+        while True:
+            time.sleep(SHARED_POLL_SECONDS)
+            try:
+                follow_once(snapshot_cache)
+                if _try_become_leader():
+                    print("INFO: Processo assumiu a atualização dos dados do Odoo (líder anterior parou).")
+                    lead()
+                    return
+            except Exception as e:
+                print(f"ATENÇÃO: Erro ao seguir o snapshot compartilhado: {type(e).__name__} - {e}")
+
+    threading.Thread(target=follow_loop, name='snapshot-follow', daemon=True).start()
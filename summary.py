@@ -0,0 +1,109 @@
+import pandas as pd
+import task_status
+
+# Agregados da aba "Resumo" (departamento x status das tarefas), calculados uma vez por snapshot.
+# A base é a contagem de tarefas por (projeto, status); o resumo por departamento sai dela com
+# poucas linhas (uma por projeto). Depois de uma sincronização incremental no mesmo dia, a
+# contagem por projeto é atualizada só com as tarefas alteradas/removidas. Com SUMMARY_SOURCE=odoo
+# a contagem vem pronta do Odoo (read_group, ver status_counts_from_groups).
+
+STATUS_COLUMNS = {'Concluída': 'done_tasks', 'Em Andamento': 'inprogress_tasks', 'Atrasada': 'delayed_tasks_individual', 'Planejada': 'planned_tasks', 'Em Risco': 'at_risk_tasks'}
+COUNT_COLUMNS = list(STATUS_COLUMNS.values()) + ['total_tasks']
+
+
+def status_counts(df_tasks):
+    """Quantidade de tarefas por (project_id_id, status_cat), como Series com MultiIndex."""
+    if df_tasks.empty or 'project_id_id' not in df_tasks.columns or 'status_cat' not in df_tasks.columns:
+        return pd.Series(dtype='int64', index=pd.MultiIndex.from_arrays([[], []], names=['project_id_id', 'status_cat']))
+    return df_tasks.groupby(['project_id_id', 'status_cat'], observed=True).size() # observed: status_cat é categórica
+
+
+def status_counts_from_groups(groups, hoje):
+    """
+    Mesma contagem de status_counts a partir dos grupos agregados no Odoo
+    (odoo_client.get_task_status_groups). As regras de status só dependem do estágio, do state e
+    de o prazo ter vencido, que são iguais para todas as tarefas de um grupo: cada grupo é
+    classificado uma vez por task_status.classify_tasks.
+    """
+    if groups is None or groups.empty:
+        return status_counts(pd.DataFrame())
+    deadline = pd.Series(pd.NaT, index=groups.index, dtype='datetime64[ns]')
+    deadline[groups['overdue'].to_numpy(dtype=bool)] = hoje - pd.Timedelta(days=1) # Qualquer prazo vencido
+    status = task_status.classify_tasks(groups.assign(date_deadline=deadline), hoje)['status_cat']
+    counts = groups['count'].groupby([groups['project_id_id'], status]).sum()
+    return counts[counts != 0].astype('int64')
+
+
+def apply_status_deltas(previous_counts, previous_tasks, current_tasks, changed_ids, removed_ids):
+    """
+    Atualiza a contagem anterior: tira as versões antigas das tarefas alteradas/removidas e soma
+    as novas versões das alteradas. Só é válido se o status das demais tarefas não mudou (mesmo dia).
+    """
+    changed_ids = set(changed_ids)
+    touched_ids = changed_ids | set(removed_ids)
+    if not touched_ids:
+        return previous_counts
+    old_counts = status_counts(previous_tasks[previous_tasks['id'].isin(touched_ids)])
+    new_counts = status_counts(current_tasks[current_tasks['id'].isin(changed_ids)])
+    counts = previous_counts.add(new_counts, fill_value=0).sub(old_counts, fill_value=0)
+    return counts[counts != 0].astype('int64')
+
+
+def department_summary(df_projects, counts):
+    """
+    Tabela do gráfico de resumo: por departamento, quantidade de projetos e de tarefas por status.
+    Retorna um DataFrame vazio se os projetos não tiverem 'id'/'department'.
+    """
+    if df_projects.empty or 'id' not in df_projects.columns or 'department' not in df_projects.columns:
+        return pd.DataFrame()
+    if not counts.empty:
+        df_task_counts_per_project = counts.unstack(fill_value=0).rename(columns=STATUS_COLUMNS)
+        for col_name in STATUS_COLUMNS.values():
+            if col_name not in df_task_counts_per_project: df_task_counts_per_project[col_name] = 0
+        df_task_counts_per_project['total_tasks'] = df_task_counts_per_project[list(STATUS_COLUMNS.values())].sum(axis=1)
+        df_task_counts_per_project = df_task_counts_per_project.reset_index()
+        df_summary_merged = pd.merge(df_projects[['id', 'department']], df_task_counts_per_project, left_on='id', right_on='project_id_id', how='left')
+    else: # Sem tarefas: só a contagem de projetos por departamento
+        df_summary_merged = df_projects[['id', 'department']].copy()
+    for col in COUNT_COLUMNS:
+        if col in df_summary_merged.columns: df_summary_merged[col] = df_summary_merged[col].fillna(0).astype(int)
+        else: df_summary_merged[col] = 0
+
+    df_proj_counts_by_dept = df_projects.groupby('department').size().reset_index(name='num_projects')
+    df_grouped_tasks_by_dept = df_summary_merged.groupby('department')[COUNT_COLUMNS].sum().reset_index()
+    df_summary_by_dept = pd.merge(df_proj_counts_by_dept, df_grouped_tasks_by_dept, on='department', how='left').fillna(0)
+    for col in df_summary_by_dept.columns:
+        if df_summary_by_dept[col].dtype == 'float64':
+            df_summary_by_dept[col] = df_summary_by_dept[col].astype(int)
+    return df_summary_by_dept
+
+
+def snapshot_summary(snapshot, previous=None):
+    """
+    Agregados de um snapshot: {'status_counts', 'by_department', 'incremental', 'from_odoo'}.
+    Usa a contagem agregada no Odoo quando a carga a trouxe (load_info['status_groups']).
+    Reaproveita a contagem do snapshot anterior quando a sincronização de tarefas foi incremental
+    a partir exatamente dele e o dia de referência (status 'Atrasada') é o mesmo; senão recalcula.
+    """
+    load_info = snapshot.load_info or {}
+    if load_info.get('status_groups') is not None: # SUMMARY_SOURCE=odoo: contagem agregada no servidor
+        counts = status_counts_from_groups(load_info['status_groups'], load_info.get('day'))
+        return {'status_counts': counts, 'by_department': department_summary(snapshot.projects, counts),
+                'incremental': False, 'from_odoo': True}
+    task_sync = load_info.get('task_sync') or {}
+    previous_summary = previous.derived.get('summary') if previous is not None else None
+    previous_info = (previous.load_info or {}) if previous is not None else {}
+    incremental = (
+        previous_summary is not None
+        and not previous_summary.get('from_odoo') # O delta só vale sobre a contagem das tarefas do snapshot
+        and task_sync.get('base_seq') is not None
+        and task_sync.get('base_seq') == (previous_info.get('task_sync') or {}).get('seq')
+        and load_info.get('day') == previous_info.get('day')
+    )
+    if incremental:
+        counts = apply_status_deltas(previous_summary['status_counts'], previous.tasks, snapshot.tasks,
+                                     task_sync.get('changed_ids') or [], task_sync.get('removed_ids') or [])
+    else:
+        counts = status_counts(snapshot.tasks)
+    return {'status_counts': counts, 'by_department': department_summary(snapshot.projects, counts),
+            'incremental': incremental, 'from_odoo': False}
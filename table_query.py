@@ -0,0 +1,121 @@
+import re
+import numpy as np
+import pandas as pd
+
+# Filtro, ordenação e paginação da DataTable feitos no servidor (filter_action/sort_action/
+# page_action = 'custom'). Entende as expressões que os filtros de cabeçalho da DataTable geram,
+# no formato "{coluna} operador valor && {coluna} operador valor".
+
+_CONDITION_RE = re.compile(r'^\{(?P<column>[^}]+)\}\s*(?P<operator>[^\s"\'`]+)\s*(?P<value>.*)$')
+_BLANK_RE = re.compile(r'^\{(?P<column>[^}]+)\}\s+is\s+(?P<negate>not\s+)?(?:blank|nil)$')
+
+_OPERATOR_ALIASES = {
+    'eq': '=', '=': '=', 'ne': '!=', '!=': '!=',
+    'lt': '<', '<': '<', 'le': '<=', '<=': '<=',
+    'gt': '>', '>': '>', 'ge': '>=', '>=': '>=',
+    'contains': 'contains', 'datestartswith': 'datestartswith',
+}
+
+
+def _unquote(value):
+    value = value.strip()
+    if len(value) >= 2 and value[0] == value[-1] and value[0] in '"\'`':
+        return value[1:-1].replace('\\' + value[0], value[0])
+    return value
+
+
+def parse_filter_query(filter_query):
+    """
+    Converte o filter_query da DataTable em uma lista de (coluna, operador, valor, sem_distinção_de_caixa).
+    Operadores: '=', '!=', '<', '<=', '>', '>=', 'contains', 'datestartswith', 'blank', 'not blank'.
+    Condições que não forem entendidas são ignoradas (como faz o filtro nativo com expressões inválidas).
+    """
+    conditions = []
+    if not filter_query:
+        return conditions
+    for part in re.split(r'\s+(?:&&|and)\s+', filter_query.strip()):
+        part = part.strip()
+        if part.startswith('(') and part.endswith(')'):
+            part = part[1:-1].strip()
+        blank = _BLANK_RE.match(part)
+        if blank:
+            conditions.append((blank.group('column'), 'not blank' if blank.group('negate') else 'blank', None, False))
+            continue
+        match = _CONDITION_RE.match(part)
+        if not match:
+            continue
+        operator = match.group('operator').lower()
+        insensitive = False
+        if operator not in _OPERATOR_ALIASES and operator[:1] in ('i', 's') and operator[1:] in _OPERATOR_ALIASES:
+            insensitive = operator[0] == 'i'
+            operator = operator[1:]
+        if operator not in _OPERATOR_ALIASES:
+            continue
+        conditions.append((match.group('column'), _OPERATOR_ALIASES[operator], _unquote(match.group('value')), insensitive))
+    return conditions
+
+
+def _parse_date(value):
+    return pd.to_datetime(value, dayfirst='/' in value, errors='coerce')
+
+
+def filter_mask(df, conditions, text_of, date_columns=()):
+    """
+    Máscara booleana das linhas de df que atendem todas as condições.
+    text_of(df, coluna) devolve a coluna como texto (o mesmo exibido na tabela); colunas em
+    date_columns comparam '<', '>' etc. como datas (valor em dd/mm/aaaa ou aaaa-mm-dd).
+    """
+    mask = np.ones(len(df), dtype=bool)
+    for column, operator, value, insensitive in conditions:
+        if column not in df.columns:
+            continue
+        if operator in ('blank', 'not blank'):
+            text = text_of(df, column)
+            blank = (df[column].isna() | (text.str.strip() == '')).to_numpy()
+            mask &= blank if operator == 'blank' else ~blank
+            continue
+        if column in date_columns and operator in ('<', '<=', '>', '>=', '=', '!='):
+            target = _parse_date(value)
+            if pd.notna(target):
+                dates = pd.to_datetime(df[column], errors='coerce').dt.normalize()
+                compared = {'<': dates < target, '<=': dates <= target, '>': dates > target,
+                            '>=': dates >= target, '=': dates == target, '!=': dates != target}[operator]
+                mask &= compared.fillna(operator == '!=').to_numpy(dtype=bool)
+                continue
+        text = text_of(df, column)
+        if insensitive:
+            text, value = text.str.lower(), value.lower()
+        if operator == 'contains':
+            mask &= text.str.contains(value, regex=False).to_numpy(dtype=bool)
+        elif operator == 'datestartswith':
+            mask &= text.str.startswith(value).to_numpy(dtype=bool)
+        elif operator in ('=', '!='):
+            equal = (text == value).to_numpy(dtype=bool)
+            mask &= equal if operator == '=' else ~equal
+        else:
+            compared = {'<': text < value, '<=': text <= value, '>': text > value, '>=': text >= value}[operator]
+            mask &= compared.to_numpy(dtype=bool)
+    return mask
+
+
+def sort_frame(df, sort_by, key_of):
+    """
+    Ordena df conforme o sort_by da DataTable ([{'column_id', 'direction'}, ...]).
+    key_of(df, coluna) devolve a Series usada para ordenar (ex.: datas reais em vez do texto dd/mm/aaaa).
+    Valores vazios vão para o fim; empates mantêm a ordem atual.
+    """
+    sort_by = [s for s in (sort_by or []) if s.get('column_id') in df.columns]
+    if not sort_by or df.empty:
+        return df
+    keys = pd.DataFrame({f'__k{i}': key_of(df, s['column_id']).to_numpy() for i, s in enumerate(sort_by)})
+    order = keys.sort_values(list(keys.columns), ascending=[s.get('direction') != 'desc' for s in sort_by],
+                             na_position='last', kind='stable').index.to_numpy()
+    return df.iloc[order]
+
+
+def page_bounds(total_rows, page_current, page_size):
+    """Retorna (página ajustada ao total, quantidade de páginas, início, fim) para o fatiamento."""
+    page_size = max(1, int(page_size or 10))
+    page_count = max(1, -(-total_rows // page_size))
+    page = min(max(0, int(page_current or 0)), page_count - 1)
+    return page, page_count, page * page_size, (page + 1) * page_size
@@ -0,0 +1,122 @@
+import itertools
+import threading
+from collections import OrderedDict
+import numpy as np
+import pandas as pd
+import compact_snapshot
+import metrics
+from snapshot_cache import Snapshot
+
+# Segundo nível do modelo de dados (TASK_DETAIL_MODE=lazy): o snapshot publicado a cada atualização
+# traz só o resumo das tarefas (projeto, estágio, estado, prazo); o detalhe completo (nome, datas,
+# tarefa-pai, dependências) de cada projeto é lido do Odoo na primeira vez em que é exibido.
+
+
+class TaskDetailCache:
+    """
+    Detalhe bruto das tarefas por projeto, guardado com a assinatura das linhas do projeto no
+    snapshot de resumo (IDs e maior write_date). Num snapshot novo só são relidos do Odoo os
+    projetos cujas tarefas mudaram. Guarda no máximo 'max_projects' projetos (LRU).
+
+    As views já montadas (snapshot de uma seleção com o detalhe preparado) ficam num cache
+    próprio e pequeno, de no máximo 'max_views' seleções (LRU), chaveado pela versão do resumo
+    e pelos projetos; clear_views() o esvazia quando um novo snapshot é publicado.
+    """
+    def __init__(self, fetcher, prepare, max_projects=1000, max_views=8):
+        self._fetcher = fetcher  # project_ids -> DataFrame bruto das tarefas (TASK_FIELDS) ou None em caso de falha
+        self._prepare = prepare  # (snapshot, project_ids, df_tasks) -> (df_projects, df_tasks) preparados
+        self.max_projects = max(1, max_projects)
+        self._raw = OrderedDict() # project_id -> (assinatura, DataFrame bruto)
+        self._lock = threading.Lock()
+        self._fetch_lock = threading.Lock() # Uma leitura por vez: sessões que pedem o mesmo projeto reaproveitam
+        self._builds = itertools.count(1)
+        self.max_views = max(1, max_views)
+        self._views = OrderedDict() # (versão do resumo, projetos) -> Snapshot montado
+
+    @staticmethod
+    def _signature(snapshot, project_id):
+        tasks = snapshot.tasks_for_project(project_id)
+        last_write = tasks['write_date'].max() if 'write_date' in tasks.columns and len(tasks) else None
+        return len(tasks), hash(tuple(tasks['id'].tolist())), str(last_write)
+
+    def _cached(self, wanted):
+        with self._lock:
+            found = {}
+            for pid, signature in wanted.items():
+                entry = self._raw.get(pid)
+                if entry is not None and entry[0] == signature:
+                    self._raw.move_to_end(pid)
+                    found[pid] = entry[1]
+            return found
+
+    def _store(self, wanted, df_tasks):
+        groups = df_tasks.groupby('project_id_id', sort=False).indices if not df_tasks.empty else {}
+        empty = _EMPTY_POSITIONS
+        frames = {pid: df_tasks.iloc[groups.get(pid, empty)] for pid in wanted}
+        with self._lock:
+            for pid, frame in frames.items():
+                self._raw[pid] = (wanted[pid], frame)
+                self._raw.move_to_end(pid)
+            while len(self._raw) > self.max_projects:
+                self._raw.popitem(last=False)
+        return frames
+
+    def view(self, snapshot, project_ids):
+        """
+        Snapshot só com os projetos pedidos e o detalhe completo das suas tarefas, na mesma ordem do
+        snapshot de resumo. Retorna None se o detalhe não puder ser lido do Odoo (falhas não ficam
+        em cache). A versão é (versão do resumo, nº da montagem): chaves de cache derivadas dela não
+        se confundem entre duas montagens do mesmo resumo.
+        """
+        key = (snapshot.version, tuple(project_ids))
+        with self._lock:
+            view = self._views.get(key)
+            if view is not None:
+                self._views.move_to_end(key)
+                return view
+        view = self._build_view(snapshot, project_ids)
+        if view is not None:
+            with self._lock:
+                self._views[key] = view
+                self._views.move_to_end(key)
+                while len(self._views) > self.max_views:
+                    self._views.popitem(last=False)
+        return view
+
+    def clear_views(self, *_):
+        """Descarta as views montadas (aceita e ignora argumentos para servir de listener)."""
+        with self._lock:
+            self._views.clear()
+
+    def _build_view(self, snapshot, project_ids):
+        wanted = {pid: self._signature(snapshot, pid) for pid in project_ids}
+        frames = self._cached(wanted)
+        if len(frames) < len(wanted):
+            with self._fetch_lock:
+                frames = self._cached(wanted) # Outra sessão pode ter acabado de ler
+                missing = {pid: sig for pid, sig in wanted.items() if pid not in frames}
+                if missing:
+                    with metrics.span('dashboard_task_detail_fetch') as info:
+                        df_tasks = self._fetcher(list(missing))
+                        info['projects'] = len(missing)
+                    if df_tasks is None:
+                        return None
+                    frames.update(self._store(missing, df_tasks))
+        parts = [frames[pid] for pid in project_ids if len(frames[pid])]
+        df_tasks = pd.concat(parts, ignore_index=True) if parts else next(iter(frames.values()), pd.DataFrame()).iloc[:0]
+        if not df_tasks.empty:
+            # Mesma ordem do resumo (desempates da tabela iguais aos do modo completo); tarefas novas no fim
+            order = compact_snapshot.positions_of(pd.Index(snapshot.tasks['id']), df_tasks['id'])
+            order = np.where(order < 0, len(snapshot.tasks), order)
+            df_tasks = df_tasks.iloc[np.argsort(order, kind='stable')].reset_index(drop=True)
+        df_projects, df_tasks = self._prepare(snapshot, project_ids, df_tasks)
+        return Snapshot((snapshot.version, next(self._builds)), df_projects, df_tasks, snapshot.fingerprint,
+                        load_info=snapshot.load_info)
+
+    def __len__(self):
+        return len(self._raw)
+
+
+_EMPTY_POSITIONS = np.array([], dtype=np.intp)
+
+metrics.registry.describe('dashboard_task_detail_fetch_seconds', 'Leituras do detalhe das tarefas de projetos (TASK_DETAIL_MODE=lazy).')
@@ -0,0 +1,264 @@
+import numpy as np
+import pandas as pd
+
+# === Regras de classificação de status das tarefas ===
+# Palavras-chave para estágios (ajuste conforme os nomes reais no seu Odoo)
+# Estas listas ajudam a interpretar o significado do estágio Kanban.
+PLANNED_STAGE_KEYWORDS = [
+    'planejad', 'a fazer', 'to do', 'backlog', 'novo',
+    'pendente', 'aguardando', 'programada', 'em espera', 'aprovad' # 'aprovad' pode significar pronto para iniciar = Planejada
+]
+INPROGRESS_STAGE_KEYWORDS = [
+    'em andamento', 'em progresso', 'fazendo', 'in progress',
+    'desenvolvimento', 'em execução', 'trabalhando'
+]
+CONCLUIDA_KEYWORDS = ['concluíd', 'done', 'finalizad', 'entregue', 'resolvid', 'fechada']
+CANCELADA_KEYWORDS = ['cancelad', 'arquivada']
+
+# 'state' interno do Odoo
+# '03_approved' pode significar "aprovado para iniciar"; a classificação dá preferência
+# ao estágio "Planejada" se aplicável.
+OPEN_TASK_STATES = ['01_in_progress', '02_changes_requested', '03_approved']
+FINAL_TASK_STATES = ['04_done', 'done', '1_done', 'cancel']
+
+
+# === Função de classificação de status da tarefa (linha a linha, referência) ===
+def classify_task_status_revised(r, hoje_param):
+    # Colunas esperadas em 'r' (linha do DataFrame):
+    # 'is_final_state' (bool) - Nova: True se a tarefa está concluída ou cancelada.
+    # 'is_actually_delayed' (bool) - Nova: True se não finalizada e prazo passou.
+    # 'stage_id_name' (str) - Nome do estágio no Kanban.
+    # 'is_open' (bool) - Original: Baseado no 'state' interno do Odoo.
+    # 'date_deadline' (datetime) - Prazo da tarefa.
+
+    if r['is_final_state']: # Prioridade 1: Tarefa em estado final
+        return 'Concluída' # Trata concluídas e canceladas como "não ativas"
+
+    if r['is_actually_delayed']: # Prioridade 2: Tarefa efetivamente atrasada
+        return 'Atrasada'
+
+    stage_name = str(r.get('stage_id_name', '')).lower() # Nome do estágio, normalizado
+
+    # Prioridade 3: Estágio Kanban indica "Planejada" explicitamente
+    if any(keyword in stage_name for keyword in PLANNED_STAGE_KEYWORDS):
+        return 'Planejada'
+
+    # Prioridade 4: Estágio Kanban indica "Em Andamento" explicitamente
+    if any(keyword in stage_name for keyword in INPROGRESS_STAGE_KEYWORDS):
+        return 'Em Andamento'
+
+    # Prioridade 5: Baseado no 'state' interno ('is_open') se o estágio não foi conclusivo
+    # 'is_open' é True se state for '01_in_progress', '02_changes_requested', '03_approved'
+    # Se '03_approved' NÃO estiver em PLANNED_STAGE_KEYWORDS, pode ser interpretado como Em Andamento aqui.
+    if r.get('is_open', False):
+        return 'Em Andamento'
+
+    # Prioridade 6: Fallback para "Planejada" (baseado em prazo futuro ou ausência de prazo)
+    # Se a tarefa não foi classificada como 'is_open' (pelo state interno) e não se encaixou acima.
+    # Se ainda ambíguo (ex: prazo passou mas não foi pega por 'is_actually_delayed')
+    # Mais seguro retornar 'Planejada' para evitar falsos "Em Andamento".
+    deadline = r.get('date_deadline') # Já deve ser datetime ou NaT
+    if (pd.notna(deadline) and deadline >= hoje_param) or pd.isna(deadline):
+        return 'Planejada'
+
+    # Default final: Se ainda ambíguo (ex: prazo passou mas não foi pega por 'is_actually_delayed')
+    # Isso é improvável se a lógica anterior estiver correta.
+    # Mais seguro retornar 'Planejada' para evitar falsos "Em Andamento".
+    return 'Planejada'
+
+
+# === Status geral do projeto (um projeto por vez, referência) ===
+def get_project_overall_status(project_row_input, project_tasks_df_input, project_calculated_end_date=None, hoje=None):
+    if hoje is None: hoje = pd.Timestamp.now().normalize()
+    project_date_start_odoo = pd.to_datetime(project_row_input.get('date_start'), errors='coerce')
+    project_date_end_odoo = pd.to_datetime(project_row_input.get('date'), errors='coerce')
+    effective_project_end_date = project_calculated_end_date
+    if pd.isna(effective_project_end_date): effective_project_end_date = project_date_end_odoo
+
+    has_tasks = not project_tasks_df_input.empty
+    project_has_any_delayed_task = False
+    project_has_any_active_task = False
+    project_all_tasks_are_done = True
+    project_only_has_planned_tasks = False
+
+    if has_tasks:
+        # Usar a coluna 'is_actually_delayed' que foi calculada com a nova lógica
+        if 'is_actually_delayed' in project_tasks_df_input.columns:
+            project_has_any_delayed_task = project_tasks_df_input['is_actually_delayed'].any()
+
+        if 'status_cat' in project_tasks_df_input.columns:
+            task_statuses = project_tasks_df_input['status_cat']
+            # 'Em Risco' não é um status_cat individual, é um status de projeto derivado de tarefas atrasadas.
+            active_task_statuses_for_project = ['Em Andamento', 'Atrasada']
+            project_has_any_active_task = task_statuses.isin(active_task_statuses_for_project).any()
+
+            project_all_tasks_are_done = (task_statuses == 'Concluída').all() if not task_statuses.empty else True
+
+            # Verifica se SÓ tem tarefas 'Planejada' (e não há ativas ou concluídas)
+            if not project_has_any_active_task and not project_all_tasks_are_done:
+                    project_only_has_planned_tasks = (task_statuses == 'Planejada').all() if not task_statuses.empty else False
+            elif task_statuses.empty : # Se não há tarefas, mas has_tasks é True (DataFrame vazio com colunas)
+                    project_only_has_planned_tasks = False # Ou True, dependendo da interpretação. False é mais seguro.
+                    project_all_tasks_are_done = True # Sem tarefas, pode ser considerado concluído ou planejado.
+        else:
+            project_all_tasks_are_done = False
+            # Fallback se 'status_cat' não estiver disponível (improvável com a nova lógica)
+            if 'is_open' in project_tasks_df_input.columns: # 'is_open' do state interno
+                    project_has_any_active_task = project_tasks_df_input['is_open'].any()
+
+    # Lógica de prioridade para status do projeto:
+    has_pending_work = project_has_any_active_task or (project_only_has_planned_tasks and has_tasks and not project_all_tasks_are_done)
+
+    # 1. Atrasada (Vermelho) - Se o projeto tem prazo final e este passou, e ainda há trabalho pendente.
+    if pd.notna(effective_project_end_date) and effective_project_end_date < hoje and has_pending_work:
+        return 'Atrasada'
+
+    # 2. Em Risco (Laranja) - Se o projeto tem QUALQUER tarefa individual atrasada.
+    if project_has_any_delayed_task: # Usa 'is_actually_delayed'
+        return 'Em Risco'
+
+    # 3. Concluída (Verde) - Se todas as tarefas estão concluídas, ou não há tarefas.
+    if project_all_tasks_are_done:
+        return 'Concluída'
+
+    # 4. Planejada (Cinza)
+    # Se não tem tarefas ativas (Em Andamento, Atrasada), e não está tudo concluído,
+    # E (ou não tem tarefas, ou todas as que tem são 'Planejada')
+    if (not has_tasks and pd.isna(project_date_start_odoo)) or \
+       (not has_tasks and pd.notna(project_date_start_odoo) and project_date_start_odoo > hoje) or \
+       (has_tasks and project_only_has_planned_tasks):
+        return 'Planejada'
+
+    # 5. Em Andamento (Amarelo)
+    if project_has_any_active_task: # Se tem tarefas 'Em Andamento' ou 'Atrasada' (Atrasada já teria virado 'Em Risco' acima, mas mantém aqui para lógica de atividade)
+        return 'Em Andamento'
+
+    # 6. Casos de Borda para Planejada ou Em Andamento baseado na data de início do projeto
+    if pd.notna(project_date_start_odoo):
+        if project_date_start_odoo > hoje and not has_pending_work: # Início futuro e sem trabalho ativo/pendente
+            return 'Planejada'
+        elif project_date_start_odoo <= hoje and not has_pending_work and not project_all_tasks_are_done : # Já deveria ter começado, sem trabalho ativo mas não concluído (ex: só tarefas planejadas, mas o projeto em si deveria estar "em andamento" por ter iniciado)
+              # Se chegou aqui e tem tarefas, e project_only_has_planned_tasks foi False, mas não há active_tasks,
+              # é uma situação estranha. Mas se só tem planejadas, o item 4 já pegou.
+              # Se já começou e não tem tarefas, o item 4 (sem tarefas com início futuro) ou 3 (sem tarefas = concluído) deveria tratar.
+              # Este fallback é para garantir que se o projeto iniciou e não caiu nas outras categorias, ele é 'Em Andamento'.
+              return 'Em Andamento'
+
+
+    return 'Planejada'
+
+
+def _stage_keyword_flags(stage_names, keywords):
+    """
+    Avalia as palavras-chave uma única vez por nome de estágio distinto (categorias)
+    e propaga o resultado para todas as linhas pelos códigos da categoria.
+    """
+    stages = stage_names.astype('category')
+    categories = stages.cat.categories
+    per_category = np.array([any(k in str(name).lower() for k in keywords) for name in categories] + [False], dtype=bool)
+    # Código -1 (estágio vazio/NaN) aponta para o último elemento (False); str(None)/str(nan) não casa com nenhuma palavra-chave
+    return per_category[stages.cat.codes.to_numpy()]
+
+
+def classify_tasks(df_tasks, hoje):
+    """
+    Versão vetorizada da classificação: retorna um DataFrame (mesmo índice de df_tasks) com
+    'is_open', 'is_final_state', 'is_actually_delayed' e 'status_cat'.
+    O resultado é idêntico a aplicar classify_task_status_revised linha a linha.
+    """
+    index = df_tasks.index
+    state = df_tasks['state'] if 'state' in df_tasks.columns else pd.Series(None, index=index, dtype=object)
+    stage_names = df_tasks['stage_id_name'] if 'stage_id_name' in df_tasks.columns else pd.Series('', index=index, dtype=object)
+    deadline = pd.to_datetime(df_tasks['date_deadline'], errors='coerce') if 'date_deadline' in df_tasks.columns \
+        else pd.Series(pd.NaT, index=index, dtype='datetime64[ns]')
+
+    is_open = state.isin(OPEN_TASK_STATES).to_numpy()
+    is_final = state.isin(FINAL_TASK_STATES).to_numpy() | _stage_keyword_flags(stage_names, CONCLUIDA_KEYWORDS + CANCELADA_KEYWORDS)
+    is_delayed = ~is_final & (deadline.notna() & (deadline < hoje)).to_numpy()
+    planned_stage = _stage_keyword_flags(stage_names, PLANNED_STAGE_KEYWORDS)
+    inprogress_stage = _stage_keyword_flags(stage_names, INPROGRESS_STAGE_KEYWORDS)
+
+    # Mesma ordem de prioridade de classify_task_status_revised
+    status = np.select(
+        [is_final, is_delayed, planned_stage, inprogress_stage, is_open],
+        ['Concluída', 'Atrasada', 'Planejada', 'Em Andamento', 'Em Andamento'],
+        default='Planejada'
+    )
+    return pd.DataFrame({
+        'is_open': is_open,
+        'is_final_state': is_final,
+        'is_actually_delayed': is_delayed,
+        'status_cat': pd.Series(status, index=index, dtype=object),
+    }, index=index)
+
+
+def project_overall_status(df_projects, df_tasks, hoje):
+    """
+    Versão vetorizada de get_project_overall_status para todos os projetos de uma vez.
+    Uma única agregação por project_id_id sobre a tabela de tarefas gera as marcas de cada projeto
+    (tem atrasada/ativa, tudo concluído, só planejadas); o prazo final usado é o mesmo que o Gantt
+    de departamento calcula (data do Odoo, senão maior prazo das tarefas, senão início + 1 dia).
+    Retorna uma Series de status com o mesmo índice de df_projects.
+    """
+    index = df_projects.index
+    if df_projects.empty or 'id' not in df_projects.columns:
+        return pd.Series(dtype=object, index=index)
+    project_ids = df_projects['id']
+    tasks = df_tasks if not df_tasks.empty and 'project_id_id' in df_tasks.columns else pd.DataFrame({'project_id_id': pd.Series(dtype='float64')})
+
+    per_task = pd.DataFrame({'project_id_id': tasks['project_id_id']})
+    per_task['task'] = 1
+    per_task['delayed'] = tasks['is_actually_delayed'].fillna(False).astype(bool) if 'is_actually_delayed' in tasks.columns else False
+    has_status = 'status_cat' in tasks.columns
+    if has_status:
+        per_task['active'] = tasks['status_cat'].isin(['Em Andamento', 'Atrasada'])
+        per_task['done'] = tasks['status_cat'] == 'Concluída'
+        per_task['planned'] = tasks['status_cat'] == 'Planejada'
+    else: # Mesmo fallback da versão linha a linha: atividade pelo 'state' interno
+        per_task['active'] = tasks['is_open'].fillna(False).astype(bool) if 'is_open' in tasks.columns else False
+        per_task['done'] = False
+        per_task['planned'] = False
+    per_task['start'] = pd.to_datetime(tasks['calculated_start'], errors='coerce') if 'calculated_start' in tasks.columns else pd.NaT
+    per_task['deadline'] = pd.to_datetime(tasks['date_deadline'], errors='coerce') if 'date_deadline' in tasks.columns else pd.NaT
+    flags = per_task.groupby('project_id_id').agg(
+        n_tasks=('task', 'sum'), any_delayed=('delayed', 'any'), any_active=('active', 'any'),
+        n_done=('done', 'sum'), n_planned=('planned', 'sum'), min_start=('start', 'min'), max_deadline=('deadline', 'max'))
+    flags = flags.reindex(project_ids.to_numpy())
+
+    n_tasks = flags['n_tasks'].fillna(0).to_numpy()
+    has_tasks = n_tasks > 0
+    any_delayed = flags['any_delayed'].fillna(False).to_numpy(dtype=bool)
+    any_active = flags['any_active'].fillna(False).to_numpy(dtype=bool)
+    all_done = (flags['n_done'].fillna(0).to_numpy() == n_tasks) if has_status else ~has_tasks
+    only_planned = has_tasks & ~any_active & ~all_done & (flags['n_planned'].fillna(0).to_numpy() == n_tasks)
+
+    def project_dates(column):
+        if column not in df_projects.columns:
+            return np.full(len(index), np.datetime64('NaT'), dtype='datetime64[ns]')
+        return pd.to_datetime(df_projects[column], errors='coerce').astype('datetime64[ns]').to_numpy()
+    start_odoo = project_dates('date_start')
+    end_odoo = project_dates('date')
+    # Início/fim calculados como no Gantt de departamento
+    p_start = np.where(pd.isna(start_odoo), flags['min_start'].astype('datetime64[ns]').to_numpy(), start_odoo)
+    p_start = np.where(pd.isna(p_start), np.datetime64(hoje, 'ns'), p_start)
+    p_end = np.where(pd.isna(end_odoo), flags['max_deadline'].astype('datetime64[ns]').to_numpy(), end_odoo)
+    one_day_after_start = p_start + np.timedelta64(1, 'D')
+    p_end = np.where(pd.isna(p_end) | (p_end < p_start), one_day_after_start, p_end)
+
+    hoje_ns = np.datetime64(hoje, 'ns')
+    has_pending_work = any_active | only_planned
+    start_known = ~pd.isna(start_odoo)
+    starts_later = start_known & (start_odoo > hoje_ns)
+    # Mesma ordem de prioridade de get_project_overall_status
+    status = np.select(
+        [(p_end < hoje_ns) & has_pending_work,
+         any_delayed,
+         all_done,
+         (~has_tasks & ~start_known) | (~has_tasks & starts_later) | only_planned,
+         any_active,
+         starts_later & ~has_pending_work,
+         start_known & ~starts_later & ~has_pending_work & ~all_done],
+        ['Atrasada', 'Em Risco', 'Concluída', 'Planejada', 'Em Andamento', 'Planejada', 'Em Andamento'],
+        default='Planejada'
+    )
+    return pd.Series(status, index=index, dtype=object)
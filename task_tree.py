@@ -0,0 +1,96 @@
+import numpy as np
+import pandas as pd
+
+# Hierarquia de tarefas (tarefa-pai -> subtarefas) usada pelos Gantts e pela tabela de tarefas.
+# Substitui o antigo compute_depths() recursivo e a ordenação com list.index(): tudo é
+# calculado por posição (iloc) em uma única passada, sem consultas ao DataFrame dentro de laços.
+
+
+class TaskTree:
+    """
+    Árvore de tarefas indexada por posição na tabela de origem.
+    - parent[i]: posição da tarefa-pai de i (-1 se i é raiz);
+    - children[i]: posições das subtarefas de i, já ordenadas pela chave de ordenação;
+    - depth[i]: nível de i na hierarquia (0 = raiz);
+    - order: posições em ordem de profundidade (pai seguido das subtarefas), só das raízes aceitas.
+    Tarefas presas em ciclos de tarefa-pai ficam com profundidade 0 e fora de 'order'.
+    """
+    def __init__(self, ids, parent, children, depth, order):
+        self.ids = ids
+        self.parent = parent
+        self.children = children
+        self.depth = depth
+        self.order = order
+
+    def parent_ids(self):
+        """IDs das tarefas que têm pelo menos uma subtarefa."""
+        return [self.ids[pos] for pos, kids in enumerate(self.children) if kids]
+
+    def unreached(self):
+        """Posições que não aparecem em 'order' (raiz recusada ou ciclo), na ordem original."""
+        reached = np.zeros(len(self.ids), dtype=bool)
+        reached[self.order] = True
+        return np.flatnonzero(~reached)
+
+
+def build_task_tree(ids, parent_ids, sort_keys=None, root_mask=None):
+    """
+    Monta a árvore a partir dos IDs das tarefas e dos IDs das tarefas-pai (mesmo tamanho).
+    sort_keys (datas, opcional) ordena raízes e irmãos; datas vazias vêm primeiro e empates
+    mantêm a ordem de entrada. root_mask (booleanos, opcional) limita as raízes incluídas em
+    'order' (a profundidade é sempre calculada para todas as tarefas).
+    """
+    ids = list(ids)
+    n = len(ids)
+    pos_of = {}
+    for pos, task_id in enumerate(ids):
+        pos_of.setdefault(task_id, pos)
+
+    parent = np.full(n, -1, dtype=np.intp)
+    parent_list = list(parent_ids)
+    missing = np.asarray(pd.isna(parent_list), dtype=bool) if n else np.zeros(0, dtype=bool)
+    for pos in np.flatnonzero(~missing).tolist():
+        parent[pos] = pos_of.get(parent_list[pos], -1)
+
+    # NaT vira o menor int64, então tarefas sem data ficam na frente (como o antigo Timestamp.min).
+    # Uma ordenação estável global: ao percorrer as posições nessa ordem, cada lista de filhos
+    # (e a lista de raízes) já sai ordenada pela chave, com empates na ordem original
+    if sort_keys is not None and n:
+        keys = pd.to_datetime(pd.Series(sort_keys).reset_index(drop=True), errors='coerce').astype('datetime64[ns]').to_numpy().view('int64')
+        visit = np.argsort(keys, kind='stable')
+    else:
+        visit = np.arange(n)
+
+    children = [[] for _ in range(n)]
+    roots = []
+    for pos in visit.tolist():
+        p = parent[pos]
+        if p == -1:
+            roots.append(pos)
+        else:
+            children[p].append(pos)
+
+    accepted = np.ones(n, dtype=bool) if root_mask is None else np.asarray(root_mask, dtype=bool)
+    depth = np.zeros(n, dtype=np.int64)
+    order = []
+    for root in roots:
+        keep = bool(accepted[root])
+        stack = [root]
+        while stack:
+            pos = stack.pop()
+            if keep:
+                order.append(pos)
+            kids = children[pos]
+            for child in kids:
+                depth[child] = depth[pos] + 1
+            stack.extend(reversed(kids))
+    return TaskTree(ids, parent, children, depth, np.array(order, dtype=np.intp))
+
+
+def tree_for_frame(df_tasks, sort_column=None, root_mask=None):
+    """Atalho para DataFrames de tarefas com 'id' e 'parent_id_id' (coluna ausente = todas raízes)."""
+    n = len(df_tasks)
+    ids = df_tasks['id'].tolist() if 'id' in df_tasks.columns else list(range(n))
+    parent_ids = df_tasks['parent_id_id'].tolist() if 'parent_id_id' in df_tasks.columns else [None] * n
+    sort_keys = df_tasks[sort_column] if sort_column and sort_column in df_tasks.columns else None
+    return build_task_tree(ids, parent_ids, sort_keys=sort_keys, root_mask=root_mask)